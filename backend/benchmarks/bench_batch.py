@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Compare batch analysis throughput with the single-date workflow path.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_batch --size 20000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date
+
+from backend import server
+
+
+def random_dobs(size: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = date(1900, 1, 1).toordinal()
+    end = date.today().toordinal()
+    return [date.fromordinal(rng.randint(start, end)).isoformat() for _ in range(size)]
+
+
+def bench_single(engine, dobs):
+    started = time.perf_counter()
+    for i, dob in enumerate(dobs):
+        engine.run_workflow_sync(f'bench_{i}', 'analyze_dob', {'dob': dob})
+    return time.perf_counter() - started
+
+
+def bench_batch(engine, dobs):
+    started = time.perf_counter()
+    engine.analyze_batch(dobs)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=20000, help='number of DOBs per run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per path; the best is reported')
+    args = parser.parse_args()
+
+    # Measure computation, not ResultCache hits on repeated runs
+    engine = server.WorkflowEngine(step_delay=0, result_cache=server.ResultCache(max_size=0))
+    dobs = random_dobs(args.size)
+
+    single = min(bench_single(engine, dobs) for _ in range(args.repeat))
+    batch = min(bench_batch(engine, dobs) for _ in range(args.repeat))
+
+    print(json.dumps({
+        'size': args.size,
+        'single_items_per_second': round(args.size / single, 1),
+        'batch_items_per_second': round(args.size / batch, 1),
+        'speedup': round(single / batch, 2)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Measure how batch and workflow throughput scale with worker processes.
+
+Each worker count gets a fresh engine; ``0`` is the in-process baseline.
+Scaling is bounded by the cores available to the benchmark.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_processes --processes 0 1 2 4
+"""
+import argparse
+import json
+import os
+import time
+
+from backend import server
+from backend.benchmarks.bench_batch import random_dobs
+
+
+def bench_batch(engine, dobs):
+    started = time.perf_counter()
+    engine.analyze_batch(dobs)
+    return time.perf_counter() - started
+
+
+def bench_workflows(engine, dobs):
+    # Workflow IDs must be unique across repeats
+    workflow_ids = [engine.ids.next_id('bench') for _ in dobs]
+    started = time.perf_counter()
+    for workflow_id, dob in zip(workflow_ids, dobs):
+        engine.start_workflow(workflow_id, 'analyze_dob', {'dob': dob})
+    pending = set(workflow_ids)
+    while pending:
+        pending = {workflow_id for workflow_id in pending
+                   if engine.get_workflow_status(workflow_id)['status'] not in ('completed', 'failed')}
+        time.sleep(0.005)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[0, 1, 2, 4],
+                        help='worker process counts to compare')
+    parser.add_argument('--batch-size', type=int, default=200000, help='DOBs per batch')
+    parser.add_argument('--workflows', type=int, default=2000, help='asynchronous workflows per run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per count; the best is reported')
+    args = parser.parse_args()
+
+    dobs = random_dobs(args.batch_size)
+    runs = []
+    for processes in args.processes:
+        # Measure computation, not ResultCache hits on repeated runs
+        engine = server.WorkflowEngine(step_delay=0, processes=processes, max_workers=max(4, processes * 2),
+                                       queue_depth=args.workflows, result_cache=server.ResultCache(max_size=0))
+        try:
+            # Warm up worker processes and the calendar index before timing
+            engine.analyze_batch(dobs[:server.BATCH_PROCESS_CHUNK * 2 * max(processes, 1)])
+            batch = min(bench_batch(engine, dobs) for _ in range(args.repeat))
+            workflows = min(bench_workflows(engine, dobs[:args.workflows]) for _ in range(args.repeat))
+        finally:
+            if engine.task_queue is not None:
+                engine.task_queue.close()
+        runs.append({
+            'processes': processes,
+            'batch_items_per_second': round(len(dobs) / batch, 1),
+            'workflows_per_second': round(args.workflows / workflows, 1)
+        })
+
+    baseline = runs[0]
+    for run in runs:
+        run['batch_speedup'] = round(run['batch_items_per_second'] / baseline['batch_items_per_second'], 2)
+    print(json.dumps({'cpu_count': os.cpu_count(), 'batch_size': len(dobs), 'workflows': args.workflows,
+                      'runs': runs}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Measure per-analysis CPU time of the workflow step methods.
+
+"before" re-implements the original steps, which re-parsed the date with
+strptime in every step and scanned the zodiac table; "after" runs the
+engine's steps, which share one parsed date and use CalendarIndex.
+"per_step" times each analyze_dob step method on its own, in graph order.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_steps --size 20000
+"""
+import argparse
+import calendar
+import json
+import time
+from datetime import date, datetime
+
+from backend import server
+from backend.benchmarks.bench_batch import random_dobs
+
+
+def legacy_analysis(dob_str: str):
+    results = {}
+    dob = datetime.strptime(dob_str, '%Y-%m-%d').date()
+    if dob > date.today():
+        raise ValueError("Date of birth cannot be in the future")
+    results['validated_dob'] = dob.isoformat()
+
+    dob = datetime.strptime(results['validated_dob'], '%Y-%m-%d').date()
+    today = date.today()
+    age_years = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+    age_days = (today - dob).days
+    results['age'] = {'years': age_years, 'days': age_days,
+                      'hours': age_days * 24, 'minutes': age_days * 24 * 60}
+
+    dob = datetime.strptime(results['validated_dob'], '%Y-%m-%d').date()
+    date_key = dob.month * 100 + dob.day
+    zodiac = "Capricorn"
+    for date_limit, sign in server.ZODIAC_SIGNS:
+        if date_key <= date_limit:
+            zodiac = sign
+            break
+    results['zodiac'] = {'western': zodiac, 'chinese': server.CHINESE_ZODIAC[dob.year % 12]}
+
+    dob = datetime.strptime(results['validated_dob'], '%Y-%m-%d').date()
+    date_sum = sum(int(digit) for digit in dob.strftime('%Y%m%d'))
+    while date_sum > 9 and date_sum not in [11, 22, 33]:
+        date_sum = sum(int(digit) for digit in str(date_sum))
+    results['numerology'] = {'life_path': date_sum}
+
+    dob = datetime.strptime(results['validated_dob'], '%Y-%m-%d').date()
+    results['day_info'] = {'day_of_week': calendar.day_name[dob.weekday()],
+                           'day_number': dob.weekday() + 1}
+
+    dob = datetime.strptime(results['validated_dob'], '%Y-%m-%d').date()
+    next_birthday = date(today.year, dob.month, dob.day)
+    if next_birthday < today:
+        next_birthday = date(today.year + 1, dob.month, dob.day)
+    results['fun_facts'] = {
+        'days_to_next_birthday': (next_birthday - today).days,
+        'estimated_heartbeats': int(age_days * 24 * 60 * 60 * 1.2),
+        'lunar_cycles_lived': age_days // 29.5,
+        'seasons_experienced': age_years * 4
+    }
+    return results
+
+
+def current_analysis(engine, dob_str: str):
+    workflow = server.WorkflowRecord('bench', 'analyze_dob', [], {'dob': dob_str})
+    engine._validate_date(workflow)
+    engine._calculate_age(workflow)
+    engine._determine_zodiac(workflow)
+    engine._calculate_numerology(workflow)
+    engine._find_day_of_week(workflow)
+    engine._generate_fun_facts(workflow)
+    return workflow.results
+
+
+def cpu_us_per_analysis(analyze, dobs, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.process_time()
+        for dob in dobs:
+            analyze(dob)
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(dobs) * 1e6
+
+
+def per_step_us(engine, dobs, repeat):
+    """CPU time of each step method, run over every DOB once its dependencies have run."""
+    graph = engine.step_graphs['analyze_dob']
+    timings = {}
+    for _ in range(repeat):
+        workflows = [server.WorkflowRecord('bench', 'analyze_dob', [], {'dob': dob}) for dob in dobs]
+        for name, step in graph.items():
+            if step.handler is None:
+                continue
+            started = time.process_time()
+            for workflow in workflows:
+                step.handler(workflow)
+            elapsed = (time.process_time() - started) / len(dobs) * 1e6
+            timings[name] = min(timings.get(name, elapsed), elapsed)
+    return {name: round(us, 3) for name, us in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=20000, help='number of DOBs per run')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per variant; the best is reported')
+    args = parser.parse_args()
+
+    engine = server.WorkflowEngine(step_delay=0)
+    # Feb 29 birthdays fail in non-leap years in both variants; leave them out
+    dobs = [dob for dob in random_dobs(args.size) if not dob.endswith('-02-29')]
+    for dob in dobs[:1000]:
+        assert legacy_analysis(dob) == current_analysis(engine, dob), dob
+
+    before = cpu_us_per_analysis(legacy_analysis, dobs, args.repeat)
+    # The first pass warms the lazily built calendar index
+    after = cpu_us_per_analysis(lambda dob: current_analysis(engine, dob), dobs, args.repeat)
+
+    print(json.dumps({
+        'size': len(dobs),
+        'before_cpu_us_per_analysis': round(before, 2),
+        'after_cpu_us_per_analysis': round(after, 2),
+        'speedup': round(before / after, 2),
+        'per_step_cpu_us': per_step_us(engine, dobs, args.repeat)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Drive a locally started server.py with concurrent clients and report latency.
+
+Each client thread keeps one HTTP/1.1 connection open and repeatedly picks
+an operation from the weighted mix:
+
+    analyze  POST /api/analyze
+    status   GET /api/workflow/<id> for a workflow submitted earlier
+    health   GET /api/health
+    cycle    POST /api/analyze, then poll the workflow until it finishes
+
+Results, including the server's peak RSS, are printed as JSON. Pass
+--baseline with an earlier report to fail (exit code 1) when requests per
+second drop or p95 latency grows by more than --tolerance.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.load_test --clients 32 --duration 20 \\
+        --mix analyze=1,status=8,health=1 --step-delay 0
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from backend.benchmarks.bench_batch import random_dobs
+
+SERVER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'server.py')
+OPERATIONS = ('analyze', 'status', 'health', 'cycle')
+
+
+def parse_mix(text: str):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}'; expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, args):
+    env = dict(os.environ, PORT=str(port), WORKFLOW_STEP_DELAY=str(args.step_delay),
+               HTTP_MAX_CONNECTIONS=str(args.clients * 2 + 8))
+    env.update(args.env)
+    process = subprocess.Popen([sys.executable, SERVER_PATH], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server.py exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health/live')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("server.py did not become live within 15s")
+
+
+def peak_rss_mb(pid: int):
+    """High-water RSS of a running process, from /proc (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class Client(threading.Thread):
+    def __init__(self, port: int, mix, dobs, workflow_ids, stop: threading.Event, seed: int, args):
+        super().__init__(daemon=True)
+        self.port = port
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.dobs = dobs
+        self.workflow_ids = workflow_ids
+        self.stop = stop
+        self.rng = random.Random(seed)
+        self.args = args
+        self.etags = {}
+        self.latencies = {name: [] for name in OPERATIONS}
+        self.errors = {name: 0 for name in OPERATIONS}
+        self.rejected = 0
+        self.not_modified = 0
+        self.conn = None
+
+    def run(self):
+        while not self.stop.is_set():
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = getattr(self, operation)()
+            except (OSError, http.client.HTTPException, ValueError):
+                ok = False
+                self.conn = None
+            if ok:
+                self.latencies[operation].append(time.perf_counter() - started)
+            else:
+                self.errors[operation] += 1
+
+    def request(self, method: str, path: str, body=None, headers=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=self.args.timeout)
+        self.conn.request(method, path, body=body, headers=headers or {})
+        response = self.conn.getresponse()
+        return response, response.read()
+
+    def analyze(self) -> bool:
+        body = json.dumps({'dob': self.rng.choice(self.dobs)})
+        response, data = self.request('POST', '/api/analyze', body, {'Content-Type': 'application/json'})
+        if response.status == 429:
+            self.rejected += 1
+            return False
+        if response.status != 200:
+            return False
+        workflow_id = json.loads(data)['workflow_id']
+        self.workflow_ids.append(workflow_id)
+        return workflow_id
+
+    def status(self) -> bool:
+        if not self.workflow_ids:
+            return self.analyze()
+        workflow_id = self.rng.choice(self.workflow_ids)
+        headers = {}
+        if self.args.conditional and workflow_id in self.etags:
+            headers['If-None-Match'] = self.etags[workflow_id]
+        response, _ = self.request('GET', f'/api/workflow/{workflow_id}', headers=headers)
+        if response.status == 304:
+            self.not_modified += 1
+            return True
+        if response.getheader('ETag'):
+            self.etags[workflow_id] = response.getheader('ETag')
+        return response.status == 200
+
+    def health(self) -> bool:
+        response, _ = self.request('GET', '/api/health')
+        return response.status == 200
+
+    def cycle(self) -> bool:
+        workflow_id = self.analyze()
+        if not workflow_id:
+            return False
+        deadline = time.perf_counter() + self.args.timeout
+        while time.perf_counter() < deadline:
+            response, data = self.request('GET', f'/api/workflow/{workflow_id}')
+            if response.status != 200:
+                return False
+            if json.loads(data)['status'] != 'running':
+                return True
+            time.sleep(self.args.poll_interval)
+        return False
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(clients, elapsed: float):
+    operations = {}
+    for name in OPERATIONS:
+        latencies = sorted(latency for client in clients for latency in client.latencies[name])
+        errors = sum(client.errors[name] for client in clients)
+        if not latencies and not errors:
+            continue
+        summary = {'count': len(latencies), 'errors': errors, 'rps': round(len(latencies) / elapsed, 1)}
+        if latencies:
+            summary.update({f'p{int(q * 100)}_ms': round(percentile(latencies, q) * 1000, 3)
+                            for q in (0.5, 0.95, 0.99)})
+            summary['max_ms'] = round(latencies[-1] * 1000, 3)
+        operations[name] = summary
+    return operations
+
+
+def compare(report, baseline, tolerance: float):
+    regressions = []
+    for name, current in report['operations'].items():
+        previous = baseline.get('operations', {}).get(name)
+        if previous is None:
+            continue
+        if current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(f"{name}: rps {current['rps']} < baseline {previous['rps']}")
+        if 'p95_ms' in current and 'p95_ms' in previous and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms > baseline {previous['p95_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32, help='concurrent client connections')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of measured load')
+    parser.add_argument('--warmup', type=float, default=2, help='seconds of unmeasured load first')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('analyze=1,status=8,health=1'),
+                        help='weighted operations, e.g. analyze=1,status=8,health=1,cycle=1')
+    parser.add_argument('--step-delay', type=float, default=0, help='WORKFLOW_STEP_DELAY for the server')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra environment for the server; may be repeated')
+    parser.add_argument('--conditional', action='store_true', help='send If-None-Match on status polls')
+    parser.add_argument('--poll-interval', type=float, default=0.05, help='seconds between polls in a cycle')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request and per-cycle timeout')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', help='earlier JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression')
+    args = parser.parse_args()
+    args.env = dict(item.partition('=')[::2] for item in args.env)
+
+    port = free_port()
+    server = start_server(port, args)
+    try:
+        dobs = random_dobs(1000, args.seed)
+        workflow_ids = []
+        stop = threading.Event()
+        clients = [Client(port, args.mix, dobs, workflow_ids, stop, args.seed + i, args)
+                   for i in range(args.clients)]
+        for client in clients:
+            client.start()
+        time.sleep(args.warmup)
+        for client in clients:
+            for name in OPERATIONS:
+                client.latencies[name] = []
+                client.errors[name] = 0
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        stop.set()
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            client.join(args.timeout)
+        server_rss = peak_rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    if server_rss is None:
+        # Without /proc, fall back to the children high-water mark (KiB on Linux, bytes on macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        server_rss = round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+    operations = summarize(clients, elapsed)
+    report = {
+        'config': {
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'mix': args.mix,
+            'step_delay': args.step_delay,
+            'conditional': args.conditional,
+            'cpu_count': os.cpu_count()
+        },
+        'operations': operations,
+        'total_rps': round(sum(op['rps'] for op in operations.values()), 1),
+        'rejected_429': sum(client.rejected for client in clients),
+        'not_modified_304': sum(client.not_modified for client in clients),
+        'server_peak_rss_mb': server_rss
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare(report, json.load(f), args.tolerance)
+    print(json.dumps(report, indent=2))
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
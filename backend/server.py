@@ -1,106 +1,2503 @@
 #!/usr/bin/env python3
+import bisect
 import http.server
 import socketserver
+import socket
+import sqlite3
 import json
+import os
+import pstats
+import queue
 import urllib.parse
 from datetime import datetime, date
 import calendar
+import cProfile
+import concurrent.futures
+import csv
+import hmac
+import io
+import gzip
+import itertools
 import math
+import multiprocessing
+import multiprocessing.connection
 import time
 import threading
-from typing import Dict, Any, List
+import sys
+import traceback
+from collections import OrderedDict, deque, namedtuple
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+# (last month*100+day of the sign, sign), in calendar order
+ZODIAC_SIGNS = [
+    (120, "Capricorn"), (218, "Aquarius"), (320, "Pisces"), (419, "Aries"),
+    (520, "Taurus"), (620, "Gemini"), (722, "Cancer"), (822, "Leo"),
+    (922, "Virgo"), (1022, "Libra"), (1121, "Scorpio"), (1221, "Sagittarius"),
+    (1231, "Capricorn")
+]
+
+# Indexed by year % 12
+CHINESE_ZODIAC = ["Monkey", "Rooster", "Dog", "Pig", "Rat", "Ox",
+                  "Tiger", "Rabbit", "Dragon", "Snake", "Horse", "Goat"]
+
+
+def _build_western_zodiac_table() -> List[str]:
+    table = ["Capricorn"] * 1232
+    for key in range(1232):
+        for date_limit, sign in ZODIAC_SIGNS:
+            if key <= date_limit:
+                table[key] = sign
+                break
+    return table
+
+
+# Western sign indexed by month*100+day
+WESTERN_ZODIAC_BY_DAY = _build_western_zodiac_table()
+
+
+def _reduce_life_path(total: int) -> int:
+    while total > 9 and total not in [11, 22, 33]:
+        total = sum(int(digit) for digit in str(total))
+    return total
+
+
+# Digit sum of 0..9999, enough to cover any year, month or day
+DIGIT_SUMS = [sum(int(digit) for digit in str(n)) for n in range(10000)]
+
+
+CalendarDay = namedtuple('CalendarDay', ['western', 'chinese', 'life_path', 'weekday', 'day_name'])
+
+
+def _compute_calendar_day(day: date) -> CalendarDay:
+    weekday = day.weekday()
+    return CalendarDay(
+        western=WESTERN_ZODIAC_BY_DAY[day.month * 100 + day.day],
+        chinese=CHINESE_ZODIAC[day.year % 12],
+        life_path=_reduce_life_path(DIGIT_SUMS[day.year] + DIGIT_SUMS[day.month] + DIGIT_SUMS[day.day]),
+        weekday=weekday,
+        day_name=calendar.day_name[weekday]
+    )
+
+
+class CalendarIndex:
+    """Per-day calendar facts, built lazily one year at a time.
+
+    Dates outside ``first_year``..``last_year`` are computed on demand.
+    """
+
+    def __init__(self, first_year: int = 1900, last_year: int = 2200):
+        self.first_year = first_year
+        self.last_year = last_year
+        self._years: Dict[int, Tuple[int, List[CalendarDay]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(days) for _, days in self._years.values())
+
+    def lookup(self, day: date) -> CalendarDay:
+        year = self._years.get(day.year)
+        if year is None:
+            if not self.first_year <= day.year <= self.last_year:
+                return _compute_calendar_day(day)
+            year = self._build_year(day.year)
+        start, days = year
+        return days[day.toordinal() - start]
+
+    def _build_year(self, year: int) -> Tuple[int, List[CalendarDay]]:
+        with self._lock:
+            built = self._years.get(year)
+            if built is None:
+                start = date(year, 1, 1).toordinal()
+                end = date(year + 1, 1, 1).toordinal() if year < date.max.year else date.max.toordinal() + 1
+                built = (start, [_compute_calendar_day(date.fromordinal(o)) for o in range(start, end)])
+                self._years[year] = built
+            return built
+
+
+CALENDAR_INDEX = CalendarIndex()
+
+
+def _parse_dob(dob_str) -> date:
+    """Parse and validate a DOB string, raising ValueError like _validate_date."""
+    try:
+        if not isinstance(dob_str, str):
+            raise ValueError(f"expected a 'YYYY-MM-DD' string, got {type(dob_str).__name__}")
+        if len(dob_str) == 10 and dob_str[4] == '-' and dob_str[7] == '-' and \
+                dob_str[:4].isdigit() and dob_str[5:7].isdigit() and dob_str[8:].isdigit():
+            dob = date(int(dob_str[:4]), int(dob_str[5:7]), int(dob_str[8:]))
+        else:
+            dob = datetime.strptime(dob_str, '%Y-%m-%d').date()
+        if dob > date.today():
+            raise ValueError("Date of birth cannot be in the future")
+        return dob
+    except ValueError as e:
+        raise ValueError(f"Invalid date format: {e}")
+
+
+class Metrics:
+    """Counters and histograms exposed in the Prometheus text format.
+
+    Every thread tallies into its own dict, so recording never takes a lock
+    or contends with other threads; a scrape sums the tallies. Tallies of
+    threads that have exited are folded into a running total whenever a new
+    thread registers or a scrape runs, so per-connection request threads do
+    not accumulate even when nothing scrapes.
+    """
+
+    def __init__(self):
+        # name -> (type, help, label names, buckets)
+        self._definitions: 'OrderedDict[str, Tuple[str, str, Tuple[str, ...], Tuple[float, ...]]]' = OrderedDict()
+        self._local = threading.local()
+        self._tallies: List[Tuple[threading.Thread, Dict[Tuple[str, Tuple[str, ...]], List[float]]]] = []
+        self._retired: Dict[Tuple[str, Tuple[str, ...]], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self._definitions[name] = ('counter', help_text, labels, ())
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        self._definitions[name] = ('histogram', help_text, labels, tuple(sorted(buckets)))
+
+    def inc(self, name: str, labels: Tuple[str, ...] = (), value: float = 1):
+        tally = self._tally()
+        cell = tally.get((name, labels))
+        if cell is None:
+            cell = tally[(name, labels)] = [0]
+        cell[0] += value
+
+    def observe(self, name: str, labels: Tuple[str, ...], value: float):
+        tally = self._tally()
+        cell = tally.get((name, labels))
+        buckets = self._definitions[name][3]
+        if cell is None:
+            # One slot per bucket, one for +Inf, then the sum
+            cell = tally[(name, labels)] = [0] * (len(buckets) + 2)
+        cell[bisect.bisect_left(buckets, value)] += 1
+        cell[-1] += value
+
+    def collect(self) -> Dict[Tuple[str, Tuple[str, ...]], List[float]]:
+        """Sum every thread's tallies; returns fresh lists the caller may keep."""
+        with self._lock:
+            self._retire_exited()
+            totals = {key: list(cell) for key, cell in self._retired.items()}
+            for _, tally in self._tallies:
+                # dict() and list() copies are atomic, so a racing update is either in or out
+                self._merge(totals, dict(tally))
+        return totals
+
+    def render(self, gauges: Iterable[Tuple[str, str, float]] = ()) -> str:
+        """Render all metrics plus the given ``(name, help, value)`` gauges."""
+        totals = self.collect()
+        lines: List[str] = []
+        for name, help_text, value in gauges:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        for name, (kind, help_text, label_names, buckets) in self._definitions.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (metric, label_values), cell in sorted(totals.items()):
+                if metric != name:
+                    continue
+                labels = list(zip(label_names, label_values))
+                if kind == 'counter':
+                    lines.append(f"{name}{self._labels(labels)} {cell[0]}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + (float('inf'),), cell):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{self._labels(labels + [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labels)} {cell[-1]}")
+                lines.append(f"{name}_count{self._labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def _tally(self) -> Dict[Tuple[str, Tuple[str, ...]], List[float]]:
+        tally = getattr(self._local, 'tally', None)
+        if tally is None:
+            tally = self._local.tally = {}
+            with self._lock:
+                self._retire_exited()
+                self._tallies.append((threading.current_thread(), tally))
+        return tally
+
+    def _retire_exited(self):
+        # Callers hold self._lock
+        live = []
+        for thread, tally in self._tallies:
+            if thread.is_alive():
+                live.append((thread, tally))
+            else:
+                self._merge(self._retired, tally)
+        self._tallies = live
+
+    @staticmethod
+    def _merge(into, tally):
+        for key, cell in tally.items():
+            total = into.get(key)
+            if total is None:
+                into[key] = list(cell)
+            else:
+                for i, value in enumerate(list(cell)):
+                    total[i] += value
+
+    @staticmethod
+    def _labels(labels: List[Tuple[str, str]]) -> str:
+        if not labels:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                   for _, value in labels)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+HTTP_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STEP_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+METRICS = Metrics()
+METRICS.counter('dob_http_requests_total', 'HTTP requests handled.', ('method', 'route', 'status'))
+METRICS.histogram('dob_http_request_duration_seconds', 'Time from parsing a request to finishing the response.',
+                  HTTP_LATENCY_BUCKETS, ('method', 'route'))
+METRICS.histogram('dob_workflow_step_duration_seconds', 'Workflow step run time, including simulated delay.',
+                  STEP_LATENCY_BUCKETS, ('workflow_type', 'step'))
+METRICS.counter('dob_workflows_finished_total', 'Workflows that reached a final status.',
+                ('workflow_type', 'status'))
+METRICS.counter('dob_workflows_coalesced_total', 'Workflows that followed an identical in-flight one.',
+                ('workflow_type',))
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'started')
+
+    def __init__(self, tracer: 'Tracer', name: str, cat: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self) -> '_Span':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.complete(self.name, self.cat, self.started, time.perf_counter(), self.args)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NoSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+class Tracer:
+    """Records timed spans as Chrome trace events (viewable in Perfetto or chrome://tracing).
+
+    Off unless TRACE_PATH is set. Recording a span then costs a dict and a
+    queue put; a background thread appends events to the file as a JSON
+    array that is never closed, which both viewers accept. Past
+    ``max_bytes`` the file is rotated to ``<path>.1``. Timestamps come from
+    ``time.perf_counter``, so spans from worker processes on the same host
+    line up.
+    """
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        if path is None:
+            path = os.environ.get('TRACE_PATH') or None
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('TRACE_MAX_BYTES', 256 * 1024 * 1024))
+        self.path = path
+        self.max_bytes = max_bytes
+        self.enabled = path is not None
+        self.events_written = 0
+        self.rotations = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._named_threads: set = set()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def span(self, name: str, cat: str = 'app', **args):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, cat, args)
+
+    def complete(self, name: str, cat: str, started: float, finished: float, args: Dict[str, Any] = None):
+        """Record a span that has already ended; times are ``time.perf_counter`` values."""
+        if not self.enabled:
+            return
+        tid = threading.get_ident()
+        if tid not in self._named_threads:
+            self._named_threads.add(tid)
+            self._put({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                       'args': {'name': threading.current_thread().name}})
+        self._put({'name': name, 'cat': cat, 'ph': 'X', 'ts': round(started * 1e6, 3),
+                   'dur': round((finished - started) * 1e6, 3), 'pid': os.getpid(), 'tid': tid,
+                   'args': args or {}})
+
+    def flush(self, timeout: float = 5) -> bool:
+        """Block until every span recorded so far is in the file."""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _put(self, event: Dict[str, Any]):
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='trace-writer', daemon=True)
+                    self._writer.start()
+        self._queue.put(event)
+
+    def _write_loop(self):
+        trace_file = None
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = [item for item in batch if isinstance(item, threading.Event)]
+            lines = [json.dumps(item) + ',\n' for item in batch if not isinstance(item, threading.Event)]
+            try:
+                if lines:
+                    if trace_file is None:
+                        trace_file = self._open()
+                    trace_file.write(''.join(lines))
+                    trace_file.flush()
+                    self.events_written += len(lines)
+                    if trace_file.tell() >= self.max_bytes:
+                        trace_file.close()
+                        os.replace(self.path, self.path + '.1')
+                        self.rotations += 1
+                        trace_file = self._open()
+            except OSError as e:
+                print(f"Trace writer failed, disabling tracing: {e}", file=sys.stderr)
+                self.enabled = False
+            for waiter in waiters:
+                waiter.set()
+
+    def _open(self):
+        trace_file = open(self.path, 'a', encoding='utf-8')
+        if trace_file.tell() == 0:
+            trace_file.write('[\n')
+        # Readers that start a new file need the thread names again
+        self._named_threads = set()
+        return trace_file
+
+
+_NO_SPAN = _NoSpan()
+TRACER = Tracer()
+
+
+class OnDemandProfiler:
+    """Profiles the live server for a fixed period, one capture at a time.
+
+    ``sample`` mode snapshots every thread's stack at a fixed interval and
+    returns collapsed stacks (``frame;frame;frame count``, the input of
+    flamegraph.pl and speedscope); it sees all threads at low overhead.
+    ``cprofile`` mode runs each request and workflow that starts during the
+    capture under cProfile and returns the merged pstats report.
+    """
+
+    MODES = ('sample', 'cprofile')
+
+    def __init__(self, sample_interval: float = 0.005):
+        self.sample_interval = sample_interval
+        self._capture_lock = threading.Lock()
+        self._cprofile_until = 0.0
+        self._stats = None
+        self._stats_lock = threading.Lock()
+
+    def capture(self, seconds: float, mode: str = 'sample', limit: int = 60) -> str:
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'; expected one of {', '.join(self.MODES)}")
+        if not self._capture_lock.acquire(blocking=False):
+            raise RuntimeError("A profile capture is already running")
+        try:
+            if mode == 'sample':
+                return self._sample(seconds, limit)
+            return self._cprofile(seconds, limit)
+        finally:
+            self._capture_lock.release()
+
+    def profiled(self, fn, *args):
+        """Call ``fn(*args)``, under cProfile if a cprofile capture is running.
+
+        Profiling problems never fail the call: if the profiler cannot start
+        (Python 3.12+ allows one active profiler per process) ``fn`` runs
+        unprofiled, and a profile that cannot be merged is dropped.
+        """
+        if time.monotonic() >= self._cprofile_until:
+            return fn(*args)
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+        except Exception:
+            return fn(*args)
+        try:
+            return fn(*args)
+        finally:
+            try:
+                profile.disable()
+                with self._stats_lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profile)
+                    else:
+                        self._stats.add(profile)
+            except Exception:
+                pass
+
+    def _cprofile(self, seconds: float, limit: int) -> str:
+        self._stats = None
+        self._cprofile_until = time.monotonic() + seconds
+        try:
+            time.sleep(seconds)
+        finally:
+            self._cprofile_until = 0.0
+        with self._stats_lock:
+            stats, self._stats = self._stats, None
+        if stats is None:
+            return f"No requests or workflows ran during the {seconds}s capture\n"
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
+    def _sample(self, seconds: float, limit: int) -> str:
+        own = threading.get_ident()
+        stacks: Dict[str, int] = {}
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack = ';'.join(reversed(names))
+                stacks[stack] = stacks.get(stack, 0) + 1
+            samples += 1
+            time.sleep(self.sample_interval)
+        lines = [f"# {samples} samples over {seconds}s every {self.sample_interval * 1000:g}ms; "
+                 f"top {limit} of {len(stacks)} distinct stacks"]
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1])[:limit]:
+            lines.append(f"{stack} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+PROFILER = OnDemandProfiler()
+
 
 class HealthHandler:
     @staticmethod
-    def handle_health_check():
-        return {
+    def handle_health_check(workflow_engine=None):
+        health = {
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
             'service': 'dob-facts-backend'
         }
+        if workflow_engine is not None:
+            health['workflow_store'] = workflow_engine.workflows.stats()
+            health['result_cache'] = workflow_engine.result_cache.stats()
+            if workflow_engine.journal is not None:
+                health['journal'] = workflow_engine.journal.stats()
+            if workflow_engine.task_queue is not None:
+                health['task_queue'] = workflow_engine.task_queue.stats()
+            health['coalescing'] = workflow_engine.coalescing_stats()
+        return health
+
+class WorkflowQueueFull(RuntimeError):
+    """Raised when the scheduler run queue cannot accept another workflow."""
+
+
+class WorkflowScheduler:
+    """Fixed-size pool of worker threads fed by a bounded run queue."""
+
+    def __init__(self, target, max_workers: int = 4, queue_depth: int = 1000):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if queue_depth < 1:
+            # queue.Queue treats maxsize 0 as unbounded
+            raise ValueError("queue_depth must be at least 1")
+        self.target = target
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.run_queue: queue.Queue = queue.Queue(maxsize=queue_depth)
+        self.workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        self._ensure_workers()
+        try:
+            self.run_queue.put_nowait(item)
+        except queue.Full:
+            raise WorkflowQueueFull(f"Run queue is full ({self.queue_depth} pending workflows)")
+
+    def queue_size(self) -> int:
+        return self.run_queue.qsize()
+
+    def _ensure_workers(self):
+        # Workers are started on first use so idle engines cost no threads
+        if len(self.workers) == self.max_workers:
+            return
+        with self._lock:
+            while len(self.workers) < self.max_workers:
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"workflow-worker-{len(self.workers)}",
+                    daemon=True
+                )
+                self.workers.append(worker)
+                worker.start()
+
+    def _worker_loop(self):
+        while True:
+            item = self.run_queue.get()
+            try:
+                self.target(item)
+            except Exception:
+                # Keep the worker alive, but never lose the reason
+                print(f"Workflow worker failed on {item!r}:", file=sys.stderr)
+                traceback.print_exc()
+            finally:
+                self.run_queue.task_done()
+
+
+class EncodedBody:
+    """A JSON response body encoded once, with its gzip variant built on first use.
+
+    ``version`` identifies the state it was encoded from and doubles as the
+    ETag; bodies that are sent once and never revalidated leave it None.
+    """
+
+    __slots__ = ('body', 'version', '_gzipped')
+
+    def __init__(self, data, version: Optional[int] = None):
+        self.body = json.dumps(data).encode('utf-8')
+        self.version = version
+        self._gzipped: Optional[bytes] = None
+
+    @property
+    def etag(self) -> Optional[str]:
+        # Weak, because the gzip and identity encodings share it
+        return f'W/"{self.version}"' if self.version is not None else None
+
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+class WorkflowRecord:
+    """Compact workflow state; supports item access so step methods can treat it like a dict."""
+
+    __slots__ = ('id', 'type', 'status', 'current_step', 'steps', 'data', 'results',
+                 'started_at', 'completed_at', 'queue_wait_ms', 'error', 'finished_at',
+                 'parsed_dob', 'step_states', 'step_durations', 'version', 'owner', 'published', 'encoded')
+
+    def __init__(self, workflow_id: str, workflow_type: str, steps: List[str], data: Dict[str, Any]):
+        self.id = workflow_id
+        self.type = workflow_type
+        self.status = 'running'
+        self.current_step = 0
+        self.steps = steps
+        self.data = data
+        self.results: Dict[str, Any] = {}
+        self.started_at = datetime.now().isoformat()
+        self.completed_at: Optional[str] = None
+        self.queue_wait_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        # Monotonic finish time, used for TTL eviction
+        self.finished_at: Optional[float] = None
+        # Set by validate_date so later steps skip re-parsing
+        self.parsed_dob: Optional[date] = None
+        # Per-step status and duration in ms; steps not yet started are absent
+        self.step_states: Dict[str, str] = {}
+        self.step_durations: Dict[str, float] = {}
+        # Bumped on every observable change; lets clients wait for the next one
+        self.version = 0
+        # Worker holding the lease while the workflow runs; never serialized
+        self.owner: Optional[str] = None
+        # to_dict() as of the last publish, shared by every reader of that version
+        self.published: Optional[Dict[str, Any]] = None
+        # snapshot() as a response body, encoded on first read of each version
+        self.encoded: Optional[EncodedBody] = None
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == 'finished_at' or key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status != 'running'
+
+    def finish(self, status: str, error: Optional[str] = None):
+        if status == 'completed':
+            self.completed_at = datetime.now().isoformat()
+            self.current_step = len(self.steps)
+        self.error = error
+        self.status = status
+        self.finished_at = time.monotonic()
+        METRICS.inc('dob_workflows_finished_total', (self.type, status))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State as of the last publish; shared between readers, so treat it as read-only.
+
+        Workers change a running record in place between publishes, so
+        readers get this frozen copy rather than serializing the live record.
+        """
+        published = self.published
+        if published is not None and published['version'] == self.version:
+            return published
+        return self.to_dict()
+
+    def encoded_snapshot(self) -> 'EncodedBody':
+        encoded = self.encoded
+        if encoded is None or encoded.version != self.version:
+            snapshot = self.snapshot()
+            with TRACER.span('serialize', 'http', workflow_id=self.id):
+                encoded = self.encoded = EncodedBody(snapshot, snapshot['version'])
+        return encoded
+
+    def to_dict(self) -> Dict[str, Any]:
+        workflow = {
+            'id': self.id,
+            'type': self.type,
+            'version': self.version,
+            'status': self.status,
+            'current_step': self.current_step,
+            'steps': self.steps,
+            'data': self.data,
+            'results': dict(self.results),
+            'started_at': self.started_at,
+            'completed_at': self.completed_at,
+            'queue_wait_ms': self.queue_wait_ms,
+            'step_status': {
+                step: {
+                    'status': self.step_states.get(step, 'pending'),
+                    'duration_ms': self.step_durations.get(step)
+                }
+                for step in self.steps
+            }
+        }
+        if self.error is not None:
+            workflow['error'] = self.error
+        return workflow
+
+    @classmethod
+    def from_dict(cls, workflow: Dict[str, Any]) -> 'WorkflowRecord':
+        """Rebuild a record from ``to_dict`` output, e.g. when loaded from a shared store."""
+        record = cls(workflow['id'], workflow['type'], workflow['steps'], workflow['data'])
+        record.status = workflow['status']
+        record.version = workflow.get('version', 0)
+        record.current_step = workflow['current_step']
+        record.results = workflow['results']
+        record.started_at = workflow['started_at']
+        record.completed_at = workflow['completed_at']
+        record.queue_wait_ms = workflow.get('queue_wait_ms')
+        record.error = workflow.get('error')
+        for step, info in workflow.get('step_status', {}).items():
+            if info['status'] != 'pending':
+                record.step_states[step] = info['status']
+            if info['duration_ms'] is not None:
+                record.step_durations[step] = info['duration_ms']
+        if record.is_finished:
+            record.finished_at = time.monotonic()
+        return record
+
+
+def _deep_sizeof(obj, seen=None) -> int:
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(_deep_sizeof(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class WorkflowLeaseLost(RuntimeError):
+    """Raised when another worker has taken over a workflow this worker was running."""
+
+
+class WorkflowStateStore:
+    """Interface for where workflow records live.
+
+    ``get`` returns a record to read or advance; changes made by the owning
+    worker are written back with ``save``. Stores shared between replicas
+    also arbitrate which worker runs a workflow through ``claim`` leases.
+    """
+
+    # Shared stores cannot signal other processes, so waiters re-read this often
+    change_poll_interval: Optional[float] = None
+    is_shared = False
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, workflow_id: str) -> bool:
+        return self.get(workflow_id) is not None
+
+    def __getitem__(self, workflow_id: str) -> WorkflowRecord:
+        record = self.get(workflow_id)
+        if record is None:
+            raise KeyError(workflow_id)
+        return record
+
+    def __setitem__(self, workflow_id: str, record: WorkflowRecord):
+        raise NotImplementedError
+
+    def __delitem__(self, workflow_id: str):
+        raise NotImplementedError
+
+    def get(self, workflow_id: str, default=None) -> Optional[WorkflowRecord]:
+        raise NotImplementedError
+
+    def add(self, workflow_id: str, record: WorkflowRecord) -> bool:
+        """Insert a new record; return False, leaving the store unchanged, if the ID is taken."""
+        raise NotImplementedError
+
+    def save(self, record: WorkflowRecord, owner: str = None, lease_seconds: float = None):
+        """Persist changes to a record; raise WorkflowLeaseLost if ``owner`` no longer holds it."""
+        raise NotImplementedError
+
+    def claim(self, workflow_id: str, owner: str, lease_seconds: float) -> Optional[WorkflowRecord]:
+        """Take the lease on a running workflow, or return None if someone else holds it."""
+        raise NotImplementedError
+
+    def claim_next(self, owner: str, lease_seconds: float) -> Optional[WorkflowRecord]:
+        """Claim any running workflow that is unowned or whose lease has expired."""
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+
+class _StoreShard:
+    __slots__ = ('records', 'lock', 'last_sweep', 'evictions')
 
-class WorkflowEngine:
     def __init__(self):
-        self.workflows: Dict[str, Dict] = {}
-        self.workflow_steps = {
-            'analyze_dob': [
-                'validate_date',
-                'calculate_age',
-                'determine_zodiac',
-                'calculate_numerology',
-                'find_day_of_week',
-                'generate_fun_facts',
-                'complete'
-            ]
+        self.records: 'OrderedDict[str, WorkflowRecord]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.last_sweep = time.monotonic()
+        self.evictions = 0
+
+
+class WorkflowStore(WorkflowStateStore):
+    """Bounded in-memory workflow registry with LRU eviction and a TTL for finished workflows.
+
+    Records are spread over lock-striped shards so request threads reading
+    one workflow never wait on workers writing another. Each shard holds an
+    equal share of ``max_size`` and keeps its own LRU order; small stores use
+    a single shard so that order stays exact. Running workflows are never
+    evicted, so the store may briefly exceed ``max_size`` when every entry is
+    still in flight.
+    """
+
+    # Below this many entries per shard, per-shard LRU drifts too far from global LRU
+    MIN_SHARD_SIZE = 256
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600, sweep_interval: float = 30,
+                 shards: int = 16):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        shards = max(1, min(shards, max_size // self.MIN_SHARD_SIZE))
+        self._shards = [_StoreShard() for _ in range(shards)]
+        self._shard_size = -(-max_size // shards)
+
+    @property
+    def evictions(self) -> int:
+        return sum(shard.evictions for shard in self._shards)
+
+    def __len__(self) -> int:
+        return sum(len(shard.records) for shard in self._shards)
+
+    def __contains__(self, workflow_id: str) -> bool:
+        return workflow_id in self._shard(workflow_id).records
+
+    def __getitem__(self, workflow_id: str) -> WorkflowRecord:
+        record = self.get(workflow_id)
+        if record is None:
+            raise KeyError(workflow_id)
+        return record
+
+    def __setitem__(self, workflow_id: str, record: WorkflowRecord):
+        shard = self._shard(workflow_id)
+        with shard.lock:
+            shard.records[workflow_id] = record
+            shard.records.move_to_end(workflow_id)
+            self._evict_locked(shard)
+
+    def __delitem__(self, workflow_id: str):
+        shard = self._shard(workflow_id)
+        with shard.lock:
+            del shard.records[workflow_id]
+
+    def add(self, workflow_id: str, record: WorkflowRecord) -> bool:
+        shard = self._shard(workflow_id)
+        with shard.lock:
+            existing = shard.records.get(workflow_id)
+            if existing is not None and not self._is_expired(existing, time.monotonic()):
+                return False
+            shard.records[workflow_id] = record
+            shard.records.move_to_end(workflow_id)
+            self._evict_locked(shard)
+            return True
+
+    def get(self, workflow_id: str, default=None) -> Optional[WorkflowRecord]:
+        shard = self._shard(workflow_id)
+        with shard.lock:
+            record = shard.records.get(workflow_id)
+            if record is None:
+                return default
+            if self._is_expired(record, time.monotonic()):
+                del shard.records[workflow_id]
+                shard.evictions += 1
+                return default
+            shard.records.move_to_end(workflow_id)
+            return record
+
+    def save(self, record: WorkflowRecord, owner: str = None, lease_seconds: float = None):
+        # Records are live objects here; there is nothing to write back
+        pass
+
+    def claim(self, workflow_id: str, owner: str, lease_seconds: float) -> Optional[WorkflowRecord]:
+        record = self.get(workflow_id)
+        return record if record is not None and not record.is_finished else None
+
+    def evict_expired(self) -> int:
+        now = time.monotonic()
+        expired = 0
+        for shard in self._shards:
+            with shard.lock:
+                expired += self._sweep_locked(shard, now)
+        return expired
+
+    def stats(self, sample_size: int = 16) -> Dict[str, Any]:
+        records: List[WorkflowRecord] = []
+        for shard in self._shards:
+            with shard.lock:
+                records.extend(shard.records.values())
+        running = sum(1 for record in records if not record.is_finished)
+        # Extrapolate from a sample; walking every record would stall the caller
+        sample = records[-sample_size:]
+        per_record = sum(_deep_sizeof(record) for record in sample) / len(sample) if sample else 0
+        return {
+            'backend': 'memory',
+            'entries': len(records),
+            'running': running,
+            'shards': len(self._shards),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'evictions': self.evictions,
+            'approx_bytes': int(per_record * len(records))
+        }
+
+    def _shard(self, workflow_id: str) -> _StoreShard:
+        return self._shards[hash(workflow_id) % len(self._shards)]
+
+    def _is_expired(self, record: WorkflowRecord, now: float) -> bool:
+        return record.finished_at is not None and now - record.finished_at > self.ttl_seconds
+
+    def _sweep_locked(self, shard: _StoreShard, now: float) -> int:
+        expired = [wid for wid, record in shard.records.items() if self._is_expired(record, now)]
+        for workflow_id in expired:
+            del shard.records[workflow_id]
+        shard.evictions += len(expired)
+        shard.last_sweep = now
+        return len(expired)
+
+    def _evict_locked(self, shard: _StoreShard):
+        now = time.monotonic()
+        if now - shard.last_sweep >= self.sweep_interval:
+            self._sweep_locked(shard, now)
+        if len(shard.records) <= self._shard_size:
+            return
+        # Oldest-used first; skip anything still running
+        for workflow_id in list(shard.records):
+            if len(shard.records) <= self._shard_size:
+                break
+            if shard.records[workflow_id].is_finished:
+                del shard.records[workflow_id]
+                shard.evictions += 1
+
+
+class SQLiteWorkflowStore(WorkflowStateStore):
+    """Workflow store in a SQLite database in WAL mode, shared by every replica that opens it.
+
+    All replicas must see the same file with working POSIX locks (for example
+    a volume on one node); WAL does not work over network filesystems.
+    Size-based eviction drops the least recently *updated* finished
+    workflows, since tracking reads would turn every poll into a write.
+    """
+
+    change_poll_interval = 0.25
+    is_shared = True
+
+    def __init__(self, path: str, max_size: int = 10000, ttl_seconds: float = 3600,
+                 sweep_interval: float = 30, claim_grace: float = 5):
+        self.path = path
+        # Unowned workflows younger than this are left to the replica that queued them
+        self.claim_grace = claim_grace
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self.evictions = 0
+        self._local = threading.local()
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS workflows ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " owner TEXT,"
+                " lease_until REAL,"
+                " updated_at REAL NOT NULL,"
+                " finished_at REAL,"
+                " state TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS workflows_status ON workflows (status, updated_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM workflows").fetchone()[0]
+
+    def __setitem__(self, workflow_id: str, record: WorkflowRecord):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workflows (id, status, owner, lease_until, updated_at, finished_at, state)"
+                " VALUES (?, ?, NULL, NULL, ?, ?, ?)",
+                (workflow_id, record.status, now, now if record.is_finished else None,
+                 json.dumps(record.to_dict()))
+            )
+        self._maybe_evict()
+
+    def __delitem__(self, workflow_id: str):
+        with self._connection() as conn:
+            if conn.execute("DELETE FROM workflows WHERE id = ?", (workflow_id,)).rowcount == 0:
+                raise KeyError(workflow_id)
+
+    def add(self, workflow_id: str, record: WorkflowRecord) -> bool:
+        now = time.time()
+        with self._connection() as conn:
+            added = conn.execute(
+                "INSERT OR IGNORE INTO workflows (id, status, owner, lease_until, updated_at, finished_at, state)"
+                " VALUES (?, ?, NULL, NULL, ?, ?, ?)",
+                (workflow_id, record.status, now, now if record.is_finished else None,
+                 json.dumps(record.to_dict()))
+            ).rowcount == 1
+        if added:
+            self._maybe_evict()
+        return added
+
+    def get(self, workflow_id: str, default=None) -> Optional[WorkflowRecord]:
+        row = self._connection().execute(
+            "SELECT state, finished_at FROM workflows WHERE id = ?", (workflow_id,)
+        ).fetchone()
+        if row is None:
+            return default
+        if row[1] is not None and time.time() - row[1] > self.ttl_seconds:
+            return default
+        return WorkflowRecord.from_dict(json.loads(row[0]))
+
+    def save(self, record: WorkflowRecord, owner: str = None, lease_seconds: float = None):
+        now = time.time()
+        params = [record.status, now, now if record.is_finished else None, json.dumps(record.snapshot())]
+        sql = "UPDATE workflows SET status = ?, updated_at = ?, finished_at = ?, state = ?"
+        if owner is not None:
+            # Fence the write and extend the lease in one statement
+            sql += ", lease_until = ? WHERE id = ? AND owner = ?"
+            params += [now + (lease_seconds or 0), record.id, owner]
+        else:
+            sql += " WHERE id = ?"
+            params.append(record.id)
+        with self._connection() as conn:
+            if conn.execute(sql, params).rowcount == 0 and owner is not None:
+                raise WorkflowLeaseLost(f"Workflow {record.id} is no longer owned by {owner}")
+
+    def claim(self, workflow_id: str, owner: str, lease_seconds: float) -> Optional[WorkflowRecord]:
+        now = time.time()
+        with self._connection() as conn:
+            claimed = conn.execute(
+                "UPDATE workflows SET owner = ?, lease_until = ? WHERE id = ? AND status = 'running'"
+                " AND (owner IS NULL OR owner = ? OR lease_until < ?)",
+                (owner, now + lease_seconds, workflow_id, owner, now)
+            ).rowcount
+        return self.get(workflow_id) if claimed else None
+
+    def claim_next(self, owner: str, lease_seconds: float) -> Optional[WorkflowRecord]:
+        now = time.time()
+        candidates = self._connection().execute(
+            "SELECT id FROM workflows WHERE status = 'running'"
+            " AND ((owner IS NULL AND updated_at <= ?) OR lease_until < ?)"
+            " ORDER BY updated_at LIMIT 10",
+            (now - self.claim_grace, now)
+        ).fetchall()
+        for (workflow_id,) in candidates:
+            record = self.claim(workflow_id, owner, lease_seconds)
+            if record is not None:
+                return record
+        return None
+
+    def evict_expired(self) -> int:
+        with self._lock, self._connection() as conn:
+            removed = conn.execute(
+                "DELETE FROM workflows WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self.evictions += removed
+            self._last_sweep = time.monotonic()
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connection()
+        entries, running = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(status = 'running'), 0) FROM workflows"
+        ).fetchone()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'entries': entries,
+            'running': running,
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'evictions': self.evictions,
+            'approx_bytes': page_count * page_size
+        }
+
+    def _maybe_evict(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.evict_expired()
+        with self._lock, self._connection() as conn:
+            excess = conn.execute("SELECT COUNT(*) FROM workflows").fetchone()[0] - self.max_size
+            if excess > 0:
+                removed = conn.execute(
+                    "DELETE FROM workflows WHERE id IN (SELECT id FROM workflows WHERE status != 'running'"
+                    " ORDER BY updated_at LIMIT ?)",
+                    (excess,)
+                ).rowcount
+                self.evictions += removed
+
+
+def create_workflow_store() -> WorkflowStateStore:
+    """Build the workflow store selected by WORKFLOW_STATE_BACKEND (memory or sqlite)."""
+    max_size = int(os.environ.get('WORKFLOW_STORE_MAX_SIZE', 10000))
+    ttl_seconds = float(os.environ.get('WORKFLOW_TTL_SECONDS', 3600))
+    backend = os.environ.get('WORKFLOW_STATE_BACKEND', 'memory')
+    if backend == 'memory':
+        return WorkflowStore(max_size=max_size, ttl_seconds=ttl_seconds)
+    if backend == 'sqlite':
+        path = os.environ.get('WORKFLOW_SQLITE_PATH', 'workflows.db')
+        return SQLiteWorkflowStore(path, max_size=max_size, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown WORKFLOW_STATE_BACKEND '{backend}'")
+
+
+class WorkflowJournal:
+    """Append-only log of workflow snapshots with group commit.
+
+    ``append`` only queues a line; a writer thread collects whatever has
+    queued up, writes it and fsyncs once per batch. Replaying keeps the
+    highest-version snapshot of each workflow. When the file outgrows
+    ``max_bytes`` it is rewritten with just the running workflows and the
+    most recent ``keep_finished`` finished ones.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.005,
+                 max_bytes: int = 64 * 1024 * 1024, keep_finished: int = 1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.keep_finished = keep_finished
+        self.entries_written = 0
+        self.batches_written = 0
+        self.compactions = 0
+        self.write_errors = 0
+        self._pending: List[str] = []
+        self._appended = 0
+        self._durable = 0
+        self._cond = threading.Condition()
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._finished: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        for snapshot in self.replay():
+            self._track(snapshot)
+        self._file = open(path, 'ab')
+        self._writer = threading.Thread(target=self._write_loop, name='workflow-journal', daemon=True)
+        self._writer.start()
+
+    def append(self, snapshot: Dict[str, Any]):
+        line = json.dumps(snapshot)
+        with self._cond:
+            self._track(snapshot)
+            self._pending.append(line)
+            self._appended += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until everything appended so far is on disk."""
+        with self._cond:
+            target = self._appended
+            return self._cond.wait_for(lambda: self._durable >= target, timeout)
+
+    def replay(self) -> List[Dict[str, Any]]:
+        latest: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, 'rb') as journal:
+                for line in journal:
+                    try:
+                        snapshot = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-write
+                        continue
+                    known = latest.get(snapshot['id'])
+                    if known is None or snapshot.get('version', 0) >= known.get('version', 0):
+                        latest[snapshot['id']] = snapshot
+        except FileNotFoundError:
+            pass
+        return list(latest.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'entries_written': self.entries_written,
+            'batches_written': self.batches_written,
+            'compactions': self.compactions,
+            'write_errors': self.write_errors,
+            'pending': len(self._pending),
+            'running_workflows': len(self._running)
+        }
+
+    def _track(self, snapshot: Dict[str, Any]):
+        workflow_id = snapshot['id']
+        known = self._running.get(workflow_id) or self._finished.get(workflow_id)
+        if known is not None and known.get('version', 0) > snapshot.get('version', 0):
+            return
+        if snapshot['status'] == 'running':
+            self._running[workflow_id] = snapshot
+            return
+        self._running.pop(workflow_id, None)
+        self._finished[workflow_id] = snapshot
+        self._finished.move_to_end(workflow_id)
+        while len(self._finished) > self.keep_finished:
+            self._finished.popitem(last=False)
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+            # Give concurrent appenders a moment to join this batch
+            time.sleep(self.flush_interval)
+            with self._cond:
+                batch, self._pending = self._pending, []
+                target = self._appended
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'ab')
+                self._file.write(('\n'.join(batch) + '\n').encode('utf-8'))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self.entries_written += len(batch)
+                self.batches_written += 1
+                if self._file.tell() > self.max_bytes:
+                    self._compact()
+            except Exception as e:
+                # Keep serving and keep the writer alive; flush() must not hang
+                self.write_errors += 1
+                print(f"Workflow journal write failed: {e!r}", file=sys.stderr)
+            with self._cond:
+                self._durable = target
+                self._cond.notify_all()
+
+    def _compact(self):
+        with self._cond:
+            snapshots = list(self._finished.values()) + list(self._running.values())
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as tmp:
+            for snapshot in snapshots:
+                tmp.write((json.dumps(snapshot) + '\n').encode('utf-8'))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, self.path)
+        self.compactions += 1
+        self._file.close()
+        # If reopening fails, the next batch tries again
+        self._file = None
+        self._file = open(self.path, 'ab')
+
+
+class ProcessTaskQueue:
+    """Local task queue drained by a pool of worker processes.
+
+    Modelled on a Temporal task queue: the front end submits ``(kind,
+    payload)`` tasks, the queue hands each one to an idle worker process, and
+    the worker streams events back (``progress`` snapshots, then ``done`` or
+    ``error``). Every worker has its own pipe, so a worker killed mid-write
+    cannot wedge the others. Workers are spawned on first use and replaced if
+    they die; the task a dead worker held fails rather than hangs.
+    """
+
+    def __init__(self, processes: int):
+        if processes < 1:
+            raise ValueError("processes must be at least 1")
+        self.processes = processes
+        self.tasks_submitted = 0
+        self.tasks_completed = 0
+        self.tasks_failed = 0
+        self.workers_restarted = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._workers: Dict[Any, Any] = {}
+        self._idle: List[Any] = []
+        self._busy: Dict[Any, int] = {}
+        # Connections of replaced workers, closed by the event collector
+        self._retired: List[Any] = []
+        self._pending: deque = deque()
+        self._handles: Dict[int, queue.Queue] = {}
+        self._next_id = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup_reader, self._wakeup_writer = self._context.Pipe(duplex=False)
+        self._started = False
+        self._closed = False
+
+    def run(self, kind: str, payload: Any, on_progress=None) -> Any:
+        """Submit one task and block until a worker process finishes it."""
+        task_id, events = self._submit(kind, payload)
+        try:
+            while True:
+                event, value = events.get()
+                if event == 'progress':
+                    if on_progress is not None:
+                        on_progress(value)
+                elif event == 'done':
+                    return value
+                else:
+                    raise RuntimeError(value)
+        finally:
+            with self._lock:
+                self._handles.pop(task_id, None)
+
+    def map(self, kind: str, payloads: List[Any]) -> List[Any]:
+        """Run tasks side by side across the pool; results come back in order."""
+        submitted = [self._submit(kind, payload) for payload in payloads]
+        results = []
+        try:
+            for task_id, events in submitted:
+                while True:
+                    event, value = events.get()
+                    if event == 'done':
+                        results.append(value)
+                        break
+                    if event == 'error':
+                        raise RuntimeError(value)
+        finally:
+            with self._lock:
+                for task_id, _ in submitted:
+                    self._handles.pop(task_id, None)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'alive': sum(1 for process in self._workers.values() if process.is_alive()),
+                'busy': len(self._busy),
+                'pending': len(self._pending),
+                'tasks_submitted': self.tasks_submitted,
+                'tasks_completed': self.tasks_completed,
+                'tasks_failed': self.tasks_failed,
+                'workers_restarted': self.workers_restarted
+            }
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = dict(self._workers)
+            for conn in workers:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+        self._wakeup_writer.send(None)
+        for process in workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def _submit(self, kind: str, payload: Any) -> Tuple[int, queue.Queue]:
+        events: queue.Queue = queue.Queue()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Task queue is closed")
+            if not self._started:
+                self._started = True
+                for _ in range(self.processes):
+                    self._spawn_worker()
+                threading.Thread(target=self._collect_events, name='task-queue-events', daemon=True).start()
+            task_id = next(self._next_id)
+            self._handles[task_id] = events
+            self.tasks_submitted += 1
+            self._pending.append((task_id, kind, payload))
+            self._dispatch()
+        return task_id, events
+
+    def _retire_worker(self, conn) -> Optional[int]:
+        """Replace a dead worker; returns the ID of the task it held, if any."""
+        # Caller holds self._lock
+        process = self._workers.pop(conn)
+        process.join(timeout=1)
+        if conn in self._idle:
+            self._idle.remove(conn)
+        task_id = self._busy.pop(conn, None)
+        self._retired.append(conn)
+        self.workers_restarted += 1
+        self._spawn_worker()
+        # Have the collector start watching the new worker
+        self._wakeup_writer.send(None)
+        return task_id
+
+    def _spawn_worker(self):
+        conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_process_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        self._workers[conn] = process
+        self._idle.append(conn)
+
+    def _dispatch(self):
+        # Caller holds self._lock
+        while self._pending and self._idle:
+            conn = self._idle.pop()
+            task = self._pending.popleft()
+            try:
+                conn.send(task)
+            except OSError:
+                # The worker died while idle; hand the task to its replacement
+                self._pending.appendleft(task)
+                self._retire_worker(conn)
+                continue
+            self._busy[conn] = task[0]
+
+    def _collect_events(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                for conn in self._retired:
+                    conn.close()
+                self._retired = []
+                conns = list(self._workers)
+            for conn in multiprocessing.connection.wait(conns + [self._wakeup_reader]):
+                if conn is self._wakeup_reader:
+                    self._wakeup_reader.recv()
+                    continue
+                try:
+                    task_id, event, value = conn.recv()
+                except (EOFError, OSError):
+                    self._replace_worker(conn)
+                    continue
+                with self._lock:
+                    if event in ('done', 'error'):
+                        if event == 'done':
+                            self.tasks_completed += 1
+                        else:
+                            self.tasks_failed += 1
+                        del self._busy[conn]
+                        self._idle.append(conn)
+                        self._dispatch()
+                    handle = self._handles.get(task_id)
+                if handle is not None:
+                    handle.put((event, value))
+
+    def _replace_worker(self, conn):
+        with self._lock:
+            if self._closed or conn not in self._workers:
+                # Already replaced when a dispatch to it failed
+                return
+            process = self._workers[conn]
+            task_id = self._retire_worker(conn)
+            handle = None
+            if task_id is not None:
+                self.tasks_failed += 1
+                handle = self._handles.get(task_id)
+            self._dispatch()
+        if handle is not None:
+            handle.put(('error', f"Worker process {process.pid} exited with code {process.exitcode}"))
+
+
+class _StatsWindow:
+    """Counts over a sliding window, kept as a ring of time slots plus their running sum."""
+
+    __slots__ = ('slot_seconds', 'slots', 'totals', 'analyses', 'current')
+
+    def __init__(self, span_seconds: float, slot_count: int):
+        self.slot_seconds = span_seconds / slot_count
+        # slot index -> (counts, analyses); only slots inside the window are kept
+        self.slots: 'OrderedDict[int, Tuple[Dict[Tuple[str, Any], int], List[int]]]' = OrderedDict()
+        self.totals: Dict[Tuple[str, Any], int] = {}
+        self.analyses = 0
+        self.current = 0
+
+    def advance(self, now: float, slot_count: int):
+        self.current = int(now // self.slot_seconds)
+        oldest = self.current - slot_count + 1
+        while self.slots and next(iter(self.slots)) < oldest:
+            _, (counts, analyses) = self.slots.popitem(last=False)
+            self.analyses -= analyses[0]
+            for key, count in counts.items():
+                remaining = self.totals[key] - count
+                if remaining:
+                    self.totals[key] = remaining
+                else:
+                    del self.totals[key]
+
+    def add(self, counts: Dict[Tuple[str, Any], int], analyses: int):
+        slot = self.slots.get(self.current)
+        if slot is None:
+            slot = self.slots[self.current] = ({}, [0])
+        slot[1][0] += analyses
+        self.analyses += analyses
+        for key, count in counts.items():
+            slot[0][key] = slot[0].get(key, 0) + count
+            self.totals[key] = self.totals.get(key, 0) + count
+
+
+class AnalysisStats:
+    """Distributions over completed DOB analyses, maintained as each one finishes.
+
+    Counts never depend on the workflow store, so they survive eviction, and
+    a read costs the same however many analyses have been recorded. Windowed
+    counts keep one slot per minute (hour) or per hour (day); a slot leaves
+    the running sum once it falls out of its window. Counts are per process.
+    """
+
+    DIMENSIONS = ('western_zodiac', 'chinese_zodiac', 'life_path', 'weekday', 'age_bucket')
+    # name -> (span in seconds, slots)
+    WINDOWS = {'hour': (3600, 60), 'day': (86400, 24)}
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._totals: Dict[Tuple[str, Any], int] = {}
+        self._analyses = 0
+        self._windows = {name: _StatsWindow(span, slots) for name, (span, slots) in self.WINDOWS.items()}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def age_bucket(years: int) -> str:
+        if years >= 100:
+            return '100+'
+        decade = years // 10 * 10
+        return f"{decade}-{decade + 9}"
+
+    def record(self, results_list: Iterable[Dict[str, Any]]):
+        """Count the given analysis results, skipping any that lack the analyze_dob facts."""
+        counts: Dict[Tuple[str, Any], int] = {}
+        analyses = 0
+        for results in results_list:
+            try:
+                keys = (
+                    ('western_zodiac', results['zodiac']['western']),
+                    ('chinese_zodiac', results['zodiac']['chinese']),
+                    ('life_path', results['numerology']['life_path']),
+                    ('weekday', results['day_info']['day_of_week']),
+                    ('age_bucket', self.age_bucket(results['age']['years']))
+                )
+            except (KeyError, TypeError):
+                continue
+            analyses += 1
+            for key in keys:
+                counts[key] = counts.get(key, 0) + 1
+        if not analyses:
+            return
+        now = self._clock()
+        with self._lock:
+            self._analyses += analyses
+            for key, count in counts.items():
+                self._totals[key] = self._totals.get(key, 0) + count
+            for name, window in self._windows.items():
+                window.advance(now, self.WINDOWS[name][1])
+                window.add(counts, analyses)
+
+    def snapshot(self, window: str = None) -> Dict[str, Any]:
+        if window is not None and window not in self._windows:
+            raise ValueError(f"Unknown window '{window}'; expected one of {', '.join(self.WINDOWS)}")
+        with self._lock:
+            if window is None:
+                totals, analyses = dict(self._totals), self._analyses
+            else:
+                rolling = self._windows[window]
+                rolling.advance(self._clock(), self.WINDOWS[window][1])
+                totals, analyses = dict(rolling.totals), rolling.analyses
+        stats: Dict[str, Any] = {'window': window or 'all', 'analyses': analyses}
+        for dimension in self.DIMENSIONS:
+            stats[dimension] = {}
+        for (dimension, value), count in sorted(totals.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            stats[dimension][str(value)] = count
+        return stats
+
+
+class ResultCache:
+    """Bounded LRU of workflow results that is cleared whenever the date rolls over.
+
+    Results depend only on the input and on ``date.today()``, so entries are
+    valid for the day they were computed on.
+    """
+
+    def __init__(self, max_size: int = 50000, clock=date.today):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._clock = clock
+        self._day: Optional[date] = None
+        self._entries: 'OrderedDict[Any, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def today(self) -> date:
+        return self._clock()
+
+    def get(self, key) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._roll_over()
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, day: date, value: Dict[str, Any]):
+        with self._lock:
+            self._roll_over()
+            # A result computed before midnight must not be served after it
+            if self.max_size <= 0 or day != self._day:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations
+        }
+
+    def _roll_over(self):
+        today = self._clock()
+        if today != self._day:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._day = today
+
+
+class WorkflowStep:
+    """A named workflow step, the steps it depends on, and the callable that runs it.
+
+    ``handler`` receives the workflow record; ``None`` marks a step that only
+    gates on its dependencies, like the final ``complete`` step.
+    """
+
+    __slots__ = ('name', 'handler', 'depends_on')
+
+    def __init__(self, name: str, handler=None, depends_on: Iterable[str] = ()):
+        self.name = name
+        self.handler = handler
+        self.depends_on = tuple(depends_on)
+
+
+class AdmissionPolicy:
+    """Load thresholds for readiness and for admitting new asynchronous workflows.
+
+    ``in_flight`` counts queued workflows plus those being advanced. The
+    readiness limits sit below the admission limits: a busy replica first
+    drops out of the Service so new traffic goes elsewhere, and only if load
+    keeps growing does it start turning work away with 429.
+    """
+
+    def __init__(self, queue_capacity: int, workers: int, ready_queue_depth: int = None,
+                 ready_in_flight: int = None, admit_queue_depth: int = None, admit_in_flight: int = None,
+                 retry_after: int = None):
+        def setting(value, env_var, default):
+            # A limit of 0 would fail every check on an idle replica
+            return max(1, value if value is not None else int(os.environ.get(env_var, default)))
+        
+        self.ready_queue_depth = setting(ready_queue_depth, 'READY_MAX_QUEUE_DEPTH', queue_capacity // 2)
+        self.ready_in_flight = setting(ready_in_flight, 'READY_MAX_IN_FLIGHT', self.ready_queue_depth + workers)
+        self.admit_queue_depth = setting(admit_queue_depth, 'ADMIT_MAX_QUEUE_DEPTH', queue_capacity * 9 // 10)
+        self.admit_in_flight = setting(admit_in_flight, 'ADMIT_MAX_IN_FLIGHT', self.admit_queue_depth + workers)
+        # Seconds a rejected client is told to wait before retrying
+        self.retry_after = setting(retry_after, 'ADMIT_RETRY_AFTER', 1)
+        self.rejected = 0
+
+    def unready_reasons(self, queue_depth: int, in_flight: int) -> List[str]:
+        reasons = []
+        if queue_depth >= self.ready_queue_depth:
+            reasons.append(f"queue depth {queue_depth} >= {self.ready_queue_depth}")
+        if in_flight >= self.ready_in_flight:
+            reasons.append(f"in-flight workflows {in_flight} >= {self.ready_in_flight}")
+        return reasons
+
+    def admits(self, queue_depth: int, in_flight: int) -> bool:
+        if queue_depth >= self.admit_queue_depth or in_flight >= self.admit_in_flight:
+            self.rejected += 1
+            return False
+        return True
+
+    def thresholds(self) -> Dict[str, int]:
+        return {
+            'ready_queue_depth': self.ready_queue_depth,
+            'ready_in_flight': self.ready_in_flight,
+            'admit_queue_depth': self.admit_queue_depth,
+            'admit_in_flight': self.admit_in_flight
         }
+
+
+class WorkflowIdGenerator:
+    """Snowflake-style workflow IDs: unique across replicas and increasing within a process.
+
+    Each ID packs the millisecond clock with a 12-bit sequence into a
+    fixed-width hex number, so IDs also sort lexicographically, then appends
+    the node tag. The number never goes backwards, even if the wall clock
+    does; bursts beyond 4096 IDs per millisecond borrow from the next one.
+    Set WORKFLOW_NODE_ID to a replica's stable name to make IDs traceable
+    to it; by default each process picks a random tag.
+    """
+
+    SEQUENCE_BITS = 12
+
+    def __init__(self, node: str = None, clock=time.time):
+        if node is None:
+            node = os.environ.get('WORKFLOW_NODE_ID') or os.urandom(4).hex()
+        self.node = node
+        self._clock = clock
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next_id(self, prefix: str) -> str:
+        tick = int(self._clock() * 1000) << self.SEQUENCE_BITS
+        with self._lock:
+            self._last = value = max(tick, self._last + 1)
+        return f"{prefix}_{value:016x}_{self.node}"
+
+
+class WorkflowEngine:
+    def __init__(self, max_workers: int = None, queue_depth: int = None,
+                 store: WorkflowStateStore = None, step_delay: float = None,
+                 result_cache: ResultCache = None, step_workers: int = None,
+                 lease_seconds: float = None, journal: WorkflowJournal = None,
+                 processes: int = None):
+        if step_delay is None:
+            step_delay = float(os.environ.get('WORKFLOW_STEP_DELAY', 0.5))
+        if step_delay < 0:
+            raise ValueError("step_delay cannot be negative")
+        # Simulated per-step processing time on the async path; 0 disables it
+        self.step_delay = step_delay
+        if max_workers is None:
+            max_workers = int(os.environ.get('WORKFLOW_WORKERS', 4))
+        if queue_depth is None:
+            queue_depth = int(os.environ.get('WORKFLOW_QUEUE_DEPTH', 1000))
+        if store is None:
+            store = create_workflow_store()
+        self.workflows = store
+        if lease_seconds is None:
+            lease_seconds = float(os.environ.get('WORKFLOW_LEASE_SECONDS', 30))
+        # A worker must save progress within this long or others may take over
+        self.lease_seconds = lease_seconds
+        self.node_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.ids = WorkflowIdGenerator()
+        if journal is None and os.environ.get('WORKFLOW_JOURNAL_PATH'):
+            journal = WorkflowJournal(os.environ['WORKFLOW_JOURNAL_PATH'])
+        self.journal = journal
+        if result_cache is None:
+            result_cache = ResultCache(int(os.environ.get('RESULT_CACHE_SIZE', 50000)))
+        self.result_cache = result_cache
+        self.analysis_stats = AnalysisStats()
+        self.scheduler = WorkflowScheduler(self._process_workflow, max_workers, queue_depth)
+        self.admission = AdmissionPolicy(queue_depth, max_workers)
+        if processes is None:
+            processes = int(os.environ.get('WORKFLOW_PROCESSES', 0))
+        # With worker processes, scheduler threads only dispatch and track
+        # workflows; the steps themselves run in the task queue's processes
+        self.task_queue = ProcessTaskQueue(processes) if processes > 0 else None
+        if step_workers is None:
+            step_workers = int(os.environ.get('WORKFLOW_STEP_WORKERS', 8))
+        # Shared by all workflows to run independent steps side by side
+        self.step_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=step_workers, thread_name_prefix='workflow-step'
+        )
+        # Workflows being run by this engine's workers, to skip duplicate queue entries
+        self._active: set = set()
+        self._active_lock = threading.Lock()
+        # Single-flight: one leader workflow computes each (input, day); identical
+        # submissions meanwhile follow it instead of running the steps again
+        self._inflight: Dict[Any, str] = {}
+        self._leader_keys: Dict[str, Any] = {}
+        self._followers: Dict[str, List[str]] = {}
+        self._coalesce_lock = threading.Lock()
+        self.coalesced = 0
+        self.coalesced_steps_saved = 0
+        # Conditions for workflows that have long-poll or SSE clients waiting
+        self._watches: Dict[str, threading.Condition] = {}
+        self._watchers: Dict[str, int] = {}
+        self._watch_lock = threading.Lock()
+        self.workflow_steps: Dict[str, List[str]] = {}
+        self.step_graphs: Dict[str, Dict[str, WorkflowStep]] = {}
+        self.register_workflow_type('analyze_dob', [
+            WorkflowStep('validate_date', self._validate_date),
+            WorkflowStep('calculate_age', self._calculate_age, ['validate_date']),
+            WorkflowStep('determine_zodiac', self._determine_zodiac, ['validate_date']),
+            WorkflowStep('calculate_numerology', self._calculate_numerology, ['validate_date']),
+            WorkflowStep('find_day_of_week', self._find_day_of_week, ['validate_date']),
+            WorkflowStep('generate_fun_facts', self._generate_fun_facts, ['calculate_age']),
+            WorkflowStep('complete', None, ['determine_zodiac', 'calculate_numerology',
+                                            'find_day_of_week', 'generate_fun_facts'])
+        ])
+        if store.is_shared:
+            # Pick up work submitted on other replicas or abandoned by dead ones
+            threading.Thread(target=self._claim_loop, name='workflow-claimer', daemon=True).start()
+        if journal is not None:
+            self.recover_from_journal()
     
-    def start_workflow(self, workflow_id: str, workflow_type: str, data: Dict[str, Any]) -> str:
-        workflow = {
-            'id': workflow_id,
-            'type': workflow_type,
-            'status': 'running',
-            'current_step': 0,
-            'steps': self.workflow_steps.get(workflow_type, []),
-            'data': data,
-            'results': {},
-            'started_at': datetime.now().isoformat(),
-            'completed_at': None
+    def coalescing_stats(self) -> Dict[str, int]:
+        with self._coalesce_lock:
+            waiting = sum(len(followers) for followers in self._followers.values())
+            leaders = len(self._inflight)
+        return {
+            'leaders_in_flight': leaders,
+            'followers_waiting': waiting,
+            'coalesced': self.coalesced,
+            'steps_saved': self.coalesced_steps_saved
+        }
+    
+    def load(self) -> Dict[str, int]:
+        queue_depth = self.scheduler.queue_size()
+        return {'queue_depth': queue_depth, 'in_flight': queue_depth + len(self._active)}
+    
+    def readiness(self) -> Dict[str, Any]:
+        """Whether this replica should receive new traffic, with the load behind the answer."""
+        load = self.load()
+        reasons = self.admission.unready_reasons(load['queue_depth'], load['in_flight'])
+        return {
+            'status': 'unready' if reasons else 'ready',
+            'reasons': reasons,
+            'load': load,
+            'thresholds': self.admission.thresholds()
         }
-        self.workflows[workflow_id] = workflow
+    
+    def admit(self) -> bool:
+        """Whether to accept another asynchronous workflow right now."""
+        load = self.load()
+        return self.admission.admits(load['queue_depth'], load['in_flight'])
+    
+    def metrics_gauges(self) -> List[Tuple[str, str, float]]:
+        """Point-in-time values for /api/metrics; each is O(1) to read."""
+        gauges = [
+            ('dob_workflow_queue_depth', 'Workflows waiting in the run queue.', self.scheduler.queue_size()),
+            ('dob_workflows_in_progress', 'Workflows being advanced by this process.', len(self._active)),
+            ('dob_workflow_store_entries', 'Workflow records held by the store.', len(self.workflows)),
+            ('dob_result_cache_entries', 'Entries in the result cache.', len(self.result_cache)),
+            ('dob_threads', 'Live threads in the server process.', threading.active_count()),
+            ('dob_admission_rejected', 'Workflows turned away by admission control since start.',
+             self.admission.rejected),
+        ]
+        if self.task_queue is not None:
+            stats = self.task_queue.stats()
+            gauges += [
+                ('dob_task_queue_busy_workers', 'Worker processes running a task.', stats['busy']),
+                ('dob_task_queue_pending', 'Tasks waiting for a worker process.', stats['pending']),
+            ]
+        return gauges
+    
+    def register_workflow_type(self, workflow_type: str, steps: List[WorkflowStep]):
+        """Register a workflow type as a list of steps.
+
+        Steps must be listed after everything they depend on; that order is
+        the one reported in the workflow's ``steps``.
+        """
+        graph: Dict[str, WorkflowStep] = {}
+        for step in steps:
+            if step.name in graph:
+                raise ValueError(f"Duplicate step '{step.name}' in workflow '{workflow_type}'")
+            for dependency in step.depends_on:
+                if dependency not in graph:
+                    raise ValueError(
+                        f"Step '{step.name}' depends on '{dependency}', which is not registered before it"
+                    )
+            graph[step.name] = step
+        self.step_graphs[workflow_type] = graph
+        self.workflow_steps[workflow_type] = list(graph)
+    
+    def start_workflow(self, workflow_id: str, workflow_type: str, data: Dict[str, Any]) -> str:
+        workflow = WorkflowRecord(workflow_id, workflow_type, self.workflow_steps.get(workflow_type, []), data)
+        cached = self._complete_from_cache(workflow)
+        # Never overwrite a workflow another request is already tracking
+        if not self.workflows.add(workflow_id, workflow):
+            raise ValueError(f"Workflow '{workflow_id}' already exists")
+        if cached:
+            self._journal(workflow)
+            return workflow_id
+        if self._follow_inflight(workflow):
+            self._journal(workflow)
+            return workflow_id
         
-        # Start processing in background
-        threading.Thread(target=self._process_workflow, args=(workflow_id,), daemon=True).start()
+        # Hand off to the worker pool; reject rather than grow without bound
+        try:
+            self.scheduler.submit((workflow_id, time.monotonic()))
+        except WorkflowQueueFull:
+            del self.workflows[workflow_id]
+            self._release_followers(workflow_id, requeue=False)
+            raise
+        self._journal(workflow)
         return workflow_id
     
+    def _follow_inflight(self, workflow) -> bool:
+        """Attach the workflow to a running one with the same input, or make it that input's leader.
+
+        Returns True if it became a follower; it then runs no steps of its own
+        and mirrors the leader's progress and outcome under its own ID.
+        """
+        key = self._cache_key(workflow)
+        if key is None:
+            return False
+        key = (key, self.result_cache.today())
+        with self._coalesce_lock:
+            leader_id = self._inflight.get(key)
+            if leader_id is None:
+                self._inflight[key] = workflow.id
+                self._leader_keys[workflow.id] = key
+                self._followers[workflow.id] = []
+                return False
+            self._followers[leader_id].append(workflow.id)
+            self.coalesced += 1
+            self.coalesced_steps_saved += len(workflow.steps)
+            # Followers are only mirrored under the lock, so snapshots land in
+            # publish order and a follower finishes exactly once
+            leader = self.workflows.get(leader_id)
+            if leader is not None:
+                self._mirror(workflow, leader.snapshot())
+                self.workflows.save(workflow)
+        METRICS.inc('dob_workflows_coalesced_total', (workflow.type,))
+        return True
+    
+    def _mirror(self, follower, snapshot: Dict[str, Any]):
+        follower.results = dict(snapshot['results'])
+        follower.step_states = {step: info['status'] for step, info in snapshot['step_status'].items()
+                                if info['status'] != 'pending'}
+        follower.step_durations = {step: info['duration_ms'] for step, info in snapshot['step_status'].items()
+                                   if info['duration_ms'] is not None}
+        follower.current_step = snapshot['current_step']
+        if snapshot['status'] != 'running' and not follower.is_finished:
+            follower.finish(snapshot['status'], snapshot.get('error'))
+            if follower.status == 'completed':
+                self._record_analyses([follower.results])
+    
+    def _publish_to_followers(self, leader):
+        with self._coalesce_lock:
+            snapshot = leader.snapshot()
+            if snapshot['status'] != 'running':
+                followers = self._followers.pop(leader.id, [])
+                self._inflight.pop(self._leader_keys.pop(leader.id, None), None)
+            else:
+                followers = list(self._followers.get(leader.id, ()))
+            for follower_id in followers:
+                follower = self.workflows.get(follower_id)
+                if follower is None or follower.is_finished:
+                    continue
+                self._mirror(follower, snapshot)
+                self._publish(follower)
+                self.workflows.save(follower)
+                if follower.is_finished:
+                    self._journal(follower)
+    
+    def _release_followers(self, leader_id: str, requeue: bool = True):
+        """Stop coalescing on a leader this engine will not finish; its followers run on their own."""
+        with self._coalesce_lock:
+            followers = self._followers.pop(leader_id, [])
+            self._inflight.pop(self._leader_keys.pop(leader_id, None), None)
+        for follower_id in followers:
+            try:
+                if not requeue:
+                    raise WorkflowQueueFull("Run queue is full")
+                self.scheduler.submit((follower_id, time.monotonic()))
+            except WorkflowQueueFull as e:
+                follower = self.workflows.get(follower_id)
+                if follower is not None and not follower.is_finished:
+                    follower.finish('failed', str(e))
+                    self._publish(follower)
+                    self.workflows.save(follower)
+                    self._journal(follower)
+    
+    def recover_from_journal(self) -> int:
+        """Reload journaled workflows and requeue unfinished ones.
+
+        Steps the journal recorded as completed are not rerun; steps that were
+        in flight at the crash start over. Returns the number requeued.
+        """
+        resumed = 0
+        for snapshot in self.journal.replay():
+            workflow = WorkflowRecord.from_dict(snapshot)
+            workflow.steps = self.workflow_steps.get(workflow.type, workflow.steps)
+            if not workflow.is_finished:
+                for step, state in list(workflow.step_states.items()):
+                    if state != 'completed':
+                        del workflow.step_states[step]
+                # The state differs from the journaled version, so it must not share its ETag
+                workflow.version += 1
+            self.workflows[workflow.id] = workflow
+            if workflow.is_finished:
+                continue
+            try:
+                self.scheduler.submit((workflow.id, time.monotonic()))
+                resumed += 1
+            except WorkflowQueueFull:
+                workflow.finish('failed', 'Could not resume after restart: run queue is full')
+                self.workflows.save(workflow)
+                self._journal(workflow)
+        return resumed
+    
+    def get_workflow_body(self, workflow_id: str) -> Optional[EncodedBody]:
+        """The workflow's current state as a response body, or None if it is unknown."""
+        workflow = self.workflows.get(workflow_id)
+        return workflow.encoded_snapshot() if workflow is not None else None
+    
     def get_workflow_status(self, workflow_id: str) -> Dict[str, Any]:
-        return self.workflows.get(workflow_id, {})
+        workflow = self.workflows.get(workflow_id)
+        return workflow.snapshot() if workflow is not None else {}
     
-    def _process_workflow(self, workflow_id: str):
-        workflow = self.workflows[workflow_id]
+    def wait_for_change(self, workflow_id: str, since: int, timeout: float) -> Dict[str, Any]:
+        """Block until the workflow's version exceeds ``since`` or ``timeout`` elapses.
+
+        Returns immediately for finished workflows, which will not change again,
+        and returns ``{}`` for unknown ones.
+        """
+        if not math.isfinite(timeout):
+            # A NaN deadline never passes and makes every wait return at once
+            raise ValueError("timeout must be a finite number")
+        store = self.workflows
+        workflow = store.get(workflow_id)
+        if workflow is None:
+            return {}
         
+        def changed(record):
+            return record.version > since or record.is_finished
+        
+        if not changed(workflow):
+            with self._watch_lock:
+                watch = self._watches.get(workflow_id)
+                if watch is None:
+                    watch = self._watches[workflow_id] = threading.Condition()
+                self._watchers[workflow_id] = self._watchers.get(workflow_id, 0) + 1
+            try:
+                deadline = time.monotonic() + timeout
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    if store.change_poll_interval is not None:
+                        remaining = min(remaining, store.change_poll_interval)
+                    with watch:
+                        if not changed(workflow):
+                            watch.wait(remaining)
+                    if store.change_poll_interval is not None:
+                        # Records from a shared store are copies; re-read them
+                        workflow = store.get(workflow_id)
+                        if workflow is None:
+                            return {}
+                    if changed(workflow):
+                        break
+            finally:
+                with self._watch_lock:
+                    self._watchers[workflow_id] -= 1
+                    if not self._watchers[workflow_id]:
+                        del self._watchers[workflow_id]
+                        del self._watches[workflow_id]
+        return workflow.snapshot()
+    
+    def _publish(self, workflow):
+        # Bump the version before looking for waiters so none can miss it
+        workflow.version += 1
+        workflow.published = workflow.to_dict()
+        if workflow.owner is not None:
+            self.workflows.save(workflow, workflow.owner, self.lease_seconds)
+        watch = self._watches.get(workflow.id)
+        if watch is not None:
+            with watch:
+                watch.notify_all()
+        if workflow.id in self._followers:
+            self._publish_to_followers(workflow)
+    
+    def _process_workflow(self, item):
+        workflow_id, enqueued_at = item
+        with self._active_lock:
+            if workflow_id in self._active:
+                return
+            self._active.add(workflow_id)
         try:
-            for i, step in enumerate(workflow['steps']):
-                workflow['current_step'] = i
-                time.sleep(0.5)  # Simulate processing time
-                
-                if step == 'validate_date':
-                    self._validate_date(workflow)
-                elif step == 'calculate_age':
-                    self._calculate_age(workflow)
-                elif step == 'determine_zodiac':
-                    self._determine_zodiac(workflow)
-                elif step == 'calculate_numerology':
-                    self._calculate_numerology(workflow)
-                elif step == 'find_day_of_week':
-                    self._find_day_of_week(workflow)
-                elif step == 'generate_fun_facts':
-                    self._generate_fun_facts(workflow)
-                elif step == 'complete':
-                    workflow['status'] = 'completed'
-                    workflow['completed_at'] = datetime.now().isoformat()
-                    workflow['current_step'] = len(workflow['steps'])
+            PROFILER.profiled(self._advance_workflow, workflow_id, enqueued_at)
+        except Exception as e:
+            self._abort_workflow(workflow_id, e)
+        finally:
+            with self._active_lock:
+                self._active.discard(workflow_id)
+    
+    def _abort_workflow(self, workflow_id: str, error: Exception):
+        """Fail a workflow whose processing raised outside its steps, e.g. a store error."""
+        print(f"Workflow {workflow_id} aborted:", file=sys.stderr)
+        traceback.print_exc()
+        # Followers run on their own rather than inheriting an error that is not about their DOB
+        self._release_followers(workflow_id)
+        workflow = self.workflows.get(workflow_id)
+        if workflow is None or workflow.is_finished:
+            return
+        workflow.owner = None
+        workflow.finish('failed', f"Internal error: {error}")
+        self._publish(workflow)
+        self.workflows.save(workflow)
+        self._journal(workflow)
+    
+    def _advance_workflow(self, workflow_id: str, enqueued_at: float):
+        # Fails if another replica's worker already holds the workflow
+        workflow = self.workflows.claim(workflow_id, self.node_id, self.lease_seconds)
+        if workflow is None:
+            self._release_followers(workflow_id)
+            return
+        workflow.owner = self.node_id
+        queue_wait = time.monotonic() - enqueued_at
+        workflow['queue_wait_ms'] = round(queue_wait * 1000, 3)
+        if TRACER.enabled:
+            now = time.perf_counter()
+            TRACER.complete('queue_wait', 'workflow', now - queue_wait, now, {'workflow_id': workflow_id})
         
+        day = self.result_cache.today()
+        try:
+            self._publish(workflow)
+            try:
+                if self.task_queue is not None:
+                    self._run_steps_in_process(workflow)
+                else:
+                    self._run_steps(workflow, self.step_delay)
+            except WorkflowLeaseLost:
+                raise
+            except Exception as e:
+                workflow.finish('failed', str(e))
+            self._publish(workflow)
+            self._journal(workflow)
+        except WorkflowLeaseLost:
+            # Another worker took over; leave the workflow to it
+            self._release_followers(workflow_id)
+            return
+        finally:
+            workflow.owner = None
+        self._cache_results(workflow, day)
+    
+    def _run_steps_in_process(self, workflow):
+        """Run the workflow in a worker process, mirroring its progress onto the local record."""
+        def apply(snapshot, publish=True):
+            remote = WorkflowRecord.from_dict(snapshot)
+            step_completed = remote.current_step > workflow.current_step
+            for step, duration_ms in remote.step_durations.items():
+                if step not in workflow.step_durations:
+                    METRICS.observe('dob_workflow_step_duration_seconds', (workflow.type, step),
+                                    duration_ms / 1000)
+            workflow.results = remote.results
+            workflow.step_states = remote.step_states
+            workflow.step_durations = remote.step_durations
+            workflow.current_step = remote.current_step
+            if remote.is_finished:
+                workflow.finish(remote.status, remote.error)
+                if workflow.status == 'completed':
+                    self._record_analyses([workflow.results])
+            if publish:
+                self._publish(workflow)
+                if step_completed:
+                    self._journal(workflow)
+        
+        payload = {'workflow': workflow.to_dict(), 'step_delay': self.step_delay}
+        apply(self.task_queue.run('workflow', payload, on_progress=apply), publish=False)
+    
+    def _claim_loop(self, interval: float = 1.0):
+        while True:
+            try:
+                while self.scheduler.queue_size() < self.scheduler.queue_depth:
+                    workflow = self.workflows.claim_next(self.node_id, self.lease_seconds)
+                    if workflow is None:
+                        break
+                    self.scheduler.submit((workflow.id, time.monotonic()))
+            except WorkflowQueueFull:
+                # Local submissions filled the queue meanwhile; claim again next round
+                pass
+            except Exception:
+                print("Claiming shared workflows failed:", file=sys.stderr)
+                traceback.print_exc()
+            time.sleep(interval)
+    
+    def run_workflow_sync(self, workflow_id: str, workflow_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a workflow inline without the simulated step delay and return its final state."""
+        workflow = WorkflowRecord(workflow_id, workflow_type, self.workflow_steps.get(workflow_type, []), data)
+        workflow.queue_wait_ms = 0.0
+        if self._complete_from_cache(workflow):
+            return workflow.to_dict()
+        day = self.result_cache.today()
+        try:
+            self._run_steps(workflow, 0)
         except Exception as e:
-            workflow['status'] = 'failed'
-            workflow['error'] = str(e)
+            workflow.finish('failed', str(e))
+        self._cache_results(workflow, day)
+        return workflow.to_dict()
     
-    def _validate_date(self, workflow):
-        dob_str = workflow['data']['dob']
+    @staticmethod
+    def _cache_key(workflow):
+        dob = workflow['data'].get('dob') if isinstance(workflow['data'], dict) else None
+        return (workflow['type'], dob) if isinstance(dob, str) else None
+    
+    def _complete_from_cache(self, workflow) -> bool:
+        key = self._cache_key(workflow)
+        results = self.result_cache.get(key) if key is not None else None
+        if results is None:
+            return False
+        # Cached results are never mutated, so records can share them
+        workflow.results = results
+        workflow.queue_wait_ms = 0.0
+        workflow.step_states = dict.fromkeys(workflow.steps, 'completed')
+        workflow.finish('completed')
+        self._record_analyses([workflow.results])
+        return True
+    
+    def _cache_results(self, workflow, day: date):
+        key = self._cache_key(workflow)
+        if key is not None and workflow.status == 'completed':
+            self.result_cache.put(key, day, workflow.results)
+    
+    def _run_steps(self, workflow, step_delay: float):
+        """Run the workflow's step graph, then mark it completed.
+
+        With a step delay, ready steps run concurrently on the step executor
+        as soon as their dependencies finish. Without one, steps are pure CPU
+        and run inline in registration order, which is cheaper than a thread
+        hand-off under the GIL.
+        """
+        graph = self.step_graphs.get(workflow.type)
+        if not graph:
+            raise ValueError(f"Unknown workflow type '{workflow.type}'")
+        if step_delay:
+            self._run_graph_concurrently(workflow, graph, step_delay)
+        else:
+            for step in graph.values():
+                if workflow.step_states.get(step.name) == 'completed':
+                    continue
+                self._set_step_state(workflow, step.name, 'running')
+                try:
+                    self._run_step(workflow, step, 0)
+                except Exception:
+                    self._set_step_state(workflow, step.name, 'failed')
+                    raise
+                self._set_step_state(workflow, step.name, 'completed')
+        workflow.finish('completed')
+        self._record_analyses([workflow.results])
+    
+    def _run_graph_concurrently(self, workflow, graph: Dict[str, WorkflowStep], step_delay: float):
+        # Only this thread updates step states and current_step
+        completed = {name for name, state in workflow.step_states.items() if state == 'completed'}
+        remaining = {name: set(step.depends_on) - completed
+                     for name, step in graph.items() if name not in completed}
+        running: Dict[concurrent.futures.Future, str] = {}
+        
+        def submit_ready():
+            for name in [name for name, deps in remaining.items() if not deps]:
+                del remaining[name]
+                self._set_step_state(workflow, name, 'running')
+                running[self.step_executor.submit(self._run_step, workflow, graph[name], step_delay)] = name
+        
+        submit_ready()
+        while running:
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            failure = None
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    self._set_step_state(workflow, name, 'failed')
+                    failure = failure or e
+                    continue
+                self._set_step_state(workflow, name, 'completed')
+                for deps in remaining.values():
+                    deps.discard(name)
+            if failure is not None:
+                # Let steps already in flight settle so their status is final
+                for future, name in running.items():
+                    try:
+                        future.result()
+                    except Exception:
+                        self._set_step_state(workflow, name, 'failed')
+                    else:
+                        self._set_step_state(workflow, name, 'completed')
+                raise failure
+            submit_ready()
+    
+    @staticmethod
+    def _run_step(workflow, step: WorkflowStep, step_delay: float):
+        started = time.perf_counter()
         try:
-            dob = datetime.strptime(dob_str, '%Y-%m-%d').date()
+            if step_delay:
+                time.sleep(step_delay)  # Simulate processing time
+            if step.handler is not None:
+                step.handler(workflow)
+        finally:
+            finished = time.perf_counter()
+            elapsed = finished - started
+            workflow.step_durations[step.name] = round(elapsed * 1000, 3)
+            METRICS.observe('dob_workflow_step_duration_seconds', (workflow.type, step.name), elapsed)
+            TRACER.complete(step.name, 'step', started, finished, {'workflow_id': workflow.id})
+    
+    def _set_step_state(self, workflow, name: str, state: str):
+        workflow.step_states[name] = state
+        if state == 'completed':
+            workflow.current_step = sum(1 for value in workflow.step_states.values() if value == 'completed')
+        self._publish(workflow)
+        # Only worker-run workflows are recoverable; sync runs are not journaled
+        if state == 'completed' and workflow.owner is not None:
+            self._journal(workflow)
+    
+    def _record_analyses(self, results_list: Iterable[Dict[str, Any]]):
+        self.analysis_stats.record(results_list)
+    
+    def _journal(self, workflow):
+        if self.journal is not None:
+            self.journal.append(workflow.to_dict())
+    
+    def analyze_batch(self, dobs: List[Any], today: date = None) -> Dict[str, Any]:
+        """Analyze many DOBs column by column instead of one workflow per date.
+
+        Produces the same ``results`` dict per item as the step methods, with
+        invalid items reported in ``errors`` rather than failing the batch.
+        """
+        started = time.perf_counter()
+        if today is None:
             today = date.today()
-            if dob > today:
-                raise ValueError("Date of birth cannot be in the future")
-            workflow['results']['validated_dob'] = dob.isoformat()
-        except ValueError as e:
-            raise ValueError(f"Invalid date format: {e}")
+        if self.task_queue is not None and len(dobs) >= 2 * BATCH_PROCESS_CHUNK:
+            return self._analyze_batch_in_processes(dobs, today, started)
+        items: List[Dict[str, Any]] = [None] * len(dobs)
+        errors: List[Dict[str, Any]] = []
+
+        def reject(index, dob_str, message):
+            items[index] = {'dob': dob_str, 'status': 'failed', 'error': message}
+            errors.append({'index': index, 'dob': dob_str, 'error': message})
+
+        # Parse and validate, keeping the indices of the valid rows
+        indices: List[int] = []
+        parsed: List[date] = []
+        for index, dob_str in enumerate(dobs):
+            try:
+                dob = _parse_dob(dob_str)
+            except ValueError as e:
+                reject(index, dob_str, str(e))
+                continue
+            indices.append(index)
+            parsed.append(dob)
+
+        # Compute every fact as a column over the valid rows
+        today_ordinal = today.toordinal()
+        today_key = today.month * 100 + today.day
+        years = [d.year for d in parsed]
+        day_keys = [d.month * 100 + d.day for d in parsed]
+        ordinals = [d.toordinal() for d in parsed]
+        age_days = [today_ordinal - o for o in ordinals]
+        age_years = [today.year - y - (today_key < k) for y, k in zip(years, day_keys)]
+        entries = [CALENDAR_INDEX.lookup(d) for d in parsed]
+
+        for row, index in enumerate(indices):
+            dob = parsed[row]
+            try:
+                next_birthday = date(today.year, dob.month, dob.day)
+                if next_birthday < today:
+                    next_birthday = date(today.year + 1, dob.month, dob.day)
+            except ValueError as e:
+                reject(index, dobs[index], str(e))
+                continue
+            days = age_days[row]
+            hours = days * 24
+            items[index] = {
+                'dob': dobs[index],
+                'status': 'completed',
+                'results': {
+                    'validated_dob': dob.isoformat(),
+                    'age': {
+                        'years': age_years[row],
+                        'days': days,
+                        'hours': hours,
+                        'minutes': hours * 60
+                    },
+                    'zodiac': {
+                        'western': entries[row].western,
+                        'chinese': entries[row].chinese
+                    },
+                    'numerology': {
+                        'life_path': entries[row].life_path
+                    },
+                    'day_info': {
+                        'day_of_week': entries[row].day_name,
+                        'day_number': entries[row].weekday + 1
+                    },
+                    'fun_facts': {
+                        'days_to_next_birthday': (next_birthday - today).days,
+                        'estimated_heartbeats': int(days * 24 * 60 * 60 * 1.2),
+                        'lunar_cycles_lived': days // 29.5,
+                        'seasons_experienced': age_years[row] * 4
+                    }
+                }
+            }
+
+        errors.sort(key=lambda error: error['index'])
+        self._record_analyses(item['results'] for item in items if item['status'] == 'completed')
+        elapsed = time.perf_counter() - started
+        return {
+            'items': items,
+            'errors': errors,
+            'summary': {
+                'count': len(dobs),
+                'succeeded': len(dobs) - len(errors),
+                'failed': len(errors),
+                'elapsed_ms': round(elapsed * 1000, 3),
+                'items_per_second': round(len(dobs) / elapsed, 1) if elapsed > 0 else None
+            }
+        }
+    
+    def _analyze_batch_in_processes(self, dobs: List[Any], today: date, started: float) -> Dict[str, Any]:
+        chunk_size = max(BATCH_PROCESS_CHUNK, -(-len(dobs) // self.task_queue.processes))
+        offsets = range(0, len(dobs), chunk_size)
+        parts = self.task_queue.map('batch', [
+            {'dobs': dobs[offset:offset + chunk_size], 'today': today.isoformat()} for offset in offsets
+        ])
+        items: List[Dict[str, Any]] = []
+        errors: List[Dict[str, Any]] = []
+        for offset, part in zip(offsets, parts):
+            items.extend(part['items'])
+            errors.extend(dict(error, index=error['index'] + offset) for error in part['errors'])
+        self._record_analyses(item['results'] for item in items if item['status'] == 'completed')
+        elapsed = time.perf_counter() - started
+        return {
+            'items': items,
+            'errors': errors,
+            'summary': {
+                'count': len(dobs),
+                'succeeded': len(dobs) - len(errors),
+                'failed': len(errors),
+                'elapsed_ms': round(elapsed * 1000, 3),
+                'items_per_second': round(len(dobs) / elapsed, 1) if elapsed > 0 else None
+            }
+        }
+    
+    def analyze_stream(self, rows: Iterable[Tuple[Any, Optional[str]]],
+                       batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Lazily analyze (dob, error) rows in fixed-size batches.
+
+        Yields one item per row, tagged with its input index, followed by a
+        final summary. Only one batch is held at a time, and the next batch is
+        not read until the consumer has taken the previous one's items.
+        """
+        started = time.perf_counter()
+        count = failed = 0
+        batch: List[Tuple[int, Any, Optional[str]]] = []
+
+        def flush():
+            valid = [(index, dob) for index, dob, error in batch if error is None]
+            analyzed = self.analyze_batch([dob for _, dob in valid])['items'] if valid else []
+            items = {index: item for (index, _), item in zip(valid, analyzed)}
+            for index, dob, error in batch:
+                item = items.get(index) or {'dob': dob, 'status': 'failed', 'error': error}
+                yield dict(item, index=index)
+
+        for index, (dob, error) in enumerate(rows):
+            batch.append((index, dob, error))
+            if len(batch) >= batch_size:
+                for item in flush():
+                    failed += item['status'] == 'failed'
+                    yield item
+                count += len(batch)
+                batch = []
+        for item in flush():
+            failed += item['status'] == 'failed'
+            yield item
+        count += len(batch)
+
+        elapsed = time.perf_counter() - started
+        yield {
+            'summary': {
+                'count': count,
+                'succeeded': count - failed,
+                'failed': failed,
+                'elapsed_ms': round(elapsed * 1000, 3),
+                'items_per_second': round(count / elapsed, 1) if elapsed > 0 else None
+            }
+        }
+    
+    @staticmethod
+    def _dob(workflow) -> date:
+        dob = workflow.get('parsed_dob')
+        if dob is None:
+            dob = date.fromisoformat(workflow['results']['validated_dob'])
+        return dob
+    
+    def _validate_date(self, workflow):
+        dob = _parse_dob(workflow['data']['dob'])
+        workflow['parsed_dob'] = dob
+        workflow['results']['validated_dob'] = dob.isoformat()
     
     def _calculate_age(self, workflow):
-        dob = datetime.strptime(workflow['results']['validated_dob'], '%Y-%m-%d').date()
+        dob = self._dob(workflow)
         today = date.today()
         
         age_years = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-        age_days = (today - dob).days
+        age_days = today.toordinal() - dob.toordinal()
         age_hours = age_days * 24
         age_minutes = age_hours * 60
         
@@ -112,55 +2509,30 @@ class WorkflowEngine:
         }
     
     def _determine_zodiac(self, workflow):
-        dob = datetime.strptime(workflow['results']['validated_dob'], '%Y-%m-%d').date()
-        month, day = dob.month, dob.day
-        
-        zodiac_signs = [
-            (120, "Capricorn"), (218, "Aquarius"), (320, "Pisces"), (419, "Aries"),
-            (520, "Taurus"), (620, "Gemini"), (722, "Cancer"), (822, "Leo"),
-            (922, "Virgo"), (1022, "Libra"), (1121, "Scorpio"), (1221, "Sagittarius"),
-            (1231, "Capricorn")
-        ]
-        
-        date_key = month * 100 + day
-        zodiac = "Capricorn"
-        for date_limit, sign in zodiac_signs:
-            if date_key <= date_limit:
-                zodiac = sign
-                break
-        
-        chinese_zodiac = ["Monkey", "Rooster", "Dog", "Pig", "Rat", "Ox", 
-                         "Tiger", "Rabbit", "Dragon", "Snake", "Horse", "Goat"]
-        chinese_sign = chinese_zodiac[dob.year % 12]
+        entry = CALENDAR_INDEX.lookup(self._dob(workflow))
         
         workflow['results']['zodiac'] = {
-            'western': zodiac,
-            'chinese': chinese_sign
+            'western': entry.western,
+            'chinese': entry.chinese
         }
     
     def _calculate_numerology(self, workflow):
-        dob = datetime.strptime(workflow['results']['validated_dob'], '%Y-%m-%d').date()
-        
-        # Life path number
-        date_sum = sum(int(digit) for digit in dob.strftime('%Y%m%d'))
-        while date_sum > 9 and date_sum not in [11, 22, 33]:
-            date_sum = sum(int(digit) for digit in str(date_sum))
+        entry = CALENDAR_INDEX.lookup(self._dob(workflow))
         
         workflow['results']['numerology'] = {
-            'life_path': date_sum
+            'life_path': entry.life_path
         }
     
     def _find_day_of_week(self, workflow):
-        dob = datetime.strptime(workflow['results']['validated_dob'], '%Y-%m-%d').date()
-        day_of_week = calendar.day_name[dob.weekday()]
+        entry = CALENDAR_INDEX.lookup(self._dob(workflow))
         
         workflow['results']['day_info'] = {
-            'day_of_week': day_of_week,
-            'day_number': dob.weekday() + 1
+            'day_of_week': entry.day_name,
+            'day_number': entry.weekday + 1
         }
     
     def _generate_fun_facts(self, workflow):
-        dob = datetime.strptime(workflow['results']['validated_dob'], '%Y-%m-%d').date()
+        dob = self._dob(workflow)
         today = date.today()
         
         # Calculate next birthday
@@ -180,7 +2552,173 @@ class WorkflowEngine:
             'seasons_experienced': workflow['results']['age']['years'] * 4
         }
 
+class _WorkerProcessEngine(WorkflowEngine):
+    """Engine used inside a task-queue worker process; reports changes as events."""
+
+    def __init__(self, conn):
+        super().__init__(max_workers=1, store=WorkflowStore(), step_delay=0,
+                         result_cache=ResultCache(0), processes=0)
+        self.conn = conn
+        self.task_id: Optional[int] = None
+
+    def _publish(self, workflow):
+        workflow.version += 1
+        self.conn.send((self.task_id, 'progress', workflow.to_dict()))
+
+    def _record_analyses(self, results_list):
+        # The parent counts what this process computes once the results come back
+        pass
+
+    def run_task(self, task_id: int, kind: str, payload: Dict[str, Any]) -> Any:
+        self.task_id = task_id
+        if kind == 'workflow':
+            workflow = WorkflowRecord.from_dict(payload['workflow'])
+            try:
+                self._run_steps(workflow, payload['step_delay'])
+            except Exception as e:
+                workflow.finish('failed', str(e))
+            return workflow.to_dict()
+        if kind == 'batch':
+            return self.analyze_batch(payload['dobs'], date.fromisoformat(payload['today']))
+        raise ValueError(f"Unknown task kind '{kind}'")
+
+
+def _process_worker_main(conn):
+    # The parent owns the journal; a child replaying it would resume workflows twice
+    os.environ.pop('WORKFLOW_JOURNAL_PATH', None)
+    if TRACER.enabled:
+        # Appending to the parent's file would interleave partial writes
+        TRACER.path = f"{TRACER.path}.{os.getpid()}"
+    engine = _WorkerProcessEngine(conn)
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        task_id, kind, payload = task
+        try:
+            conn.send((task_id, 'done', engine.run_task(task_id, kind, payload)))
+        except Exception as e:
+            conn.send((task_id, 'error', str(e)))
+
+
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 50000))
+# JSON responses at least this large are gzipped for clients that accept it; 0 disables
+GZIP_MIN_BYTES = int(os.environ.get('GZIP_MIN_BYTES', 1024))
+# Upper bound on one /api/admin/profile capture, which holds its connection throughout
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', 60))
+# Batches below twice this size are not worth shipping to worker processes
+BATCH_PROCESS_CHUNK = int(os.environ.get('BATCH_PROCESS_CHUNK', 2000))
+LONG_POLL_MAX_WAIT = float(os.environ.get('LONG_POLL_MAX_WAIT', 30))
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 1000))
+# Socket timeout while streaming results; a client that is slow to read is
+# backpressure, not an idle keep-alive connection
+STREAM_WRITE_TIMEOUT = float(os.environ.get('STREAM_WRITE_TIMEOUT', 300))
+STREAM_READ_SIZE = 64 * 1024
+STREAM_MAX_LINE = 64 * 1024
+
+
+def iter_chunked_body(rfile) -> Iterator[bytes]:
+    """Decode a Transfer-Encoding: chunked request body as it arrives."""
+    while True:
+        size_line = rfile.readline(STREAM_MAX_LINE + 1)
+        if not size_line:
+            raise ValueError("Chunked body ended unexpectedly")
+        size = int(size_line.split(b';', 1)[0].strip(), 16)
+        if size == 0:
+            # Skip optional trailers up to the terminating blank line
+            while rfile.readline(STREAM_MAX_LINE + 1) not in (b'\r\n', b'\n', b''):
+                pass
+            return
+        while size:
+            block = rfile.read(min(size, STREAM_READ_SIZE))
+            if not block:
+                raise ValueError("Chunked body ended unexpectedly")
+            size -= len(block)
+            yield block
+        rfile.readline(STREAM_MAX_LINE + 1)
+
+
+def iter_sized_body(rfile, content_length: int) -> Iterator[bytes]:
+    while content_length > 0:
+        block = rfile.read(min(content_length, STREAM_READ_SIZE))
+        if not block:
+            raise ValueError("Request body ended unexpectedly")
+        content_length -= len(block)
+        yield block
+
+
+def iter_lines(blocks: Iterable[bytes]) -> Iterator[str]:
+    """Split a stream of byte blocks into decoded lines without buffering the whole body."""
+    pending = b''
+    for block in blocks:
+        pending += block
+        lines = pending.split(b'\n')
+        pending = lines.pop()
+        if len(pending) > STREAM_MAX_LINE:
+            raise ValueError(f"Line longer than {STREAM_MAX_LINE} bytes")
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8')
+    if pending:
+        yield pending.rstrip(b'\r').decode('utf-8')
+
+
+def parse_ndjson_rows(lines: Iterable[str]) -> Iterator[Tuple[Any, Optional[str]]]:
+    """Yield (dob, error) per non-blank line; a line is a DOB string or {"dob": ...}."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as e:
+            yield line, f"Invalid JSON: {e}"
+            continue
+        if isinstance(value, dict):
+            value = value.get('dob')
+        yield value, None
+
+
+def parse_csv_rows(lines: Iterable[str]) -> Iterator[Tuple[Any, Optional[str]]]:
+    """Yield (dob, error) per CSV row, using a 'dob' header column when present."""
+    column = 0
+    for row_number, row in enumerate(csv.reader(lines)):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        if row_number == 0:
+            header = [cell.strip().lower() for cell in row]
+            if 'dob' in header:
+                column = header.index('dob')
+                continue
+        if column >= len(row):
+            yield None, f"Missing dob column {column}"
+            continue
+        yield row[column].strip(), None
+
+
+API_ROUTES = frozenset(['/api/analyze', '/api/analyze/batch', '/api/analyze/stream', '/api/health',
+                        '/api/health/live', '/api/health/ready', '/api/metrics', '/api/stats',
+                        '/api/admin/profile'])
+
+
+def _route_label(path: str) -> str:
+    """Collapse a request path to a route template so metric label sets stay bounded."""
+    if path in API_ROUTES:
+        return path
+    if path.startswith('/api/workflow/'):
+        return '/api/workflow/{id}/events' if path.endswith('/events') else '/api/workflow/{id}'
+    return 'other'
+
+
 class DOBFactsHandler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between polls; every response must
+    # therefore carry a Content-Length
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections are dropped after this many seconds
+    timeout = int(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', 15))
+    # Headers and body go out in separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK (~40ms) on every kept-alive response
+    disable_nagle_algorithm = True
+
     def __init__(self, *args, workflow_engine=None, **kwargs):
         self.workflow_engine = workflow_engine
         super().__init__(*args, **kwargs)
@@ -190,48 +2728,287 @@ class DOBFactsHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
+    def parse_request(self):
+        # Start timing once the request line is in, not while an idle keep-alive connection waits
+        self._request_started = time.perf_counter()
+        self._response_status = None
+        # A malformed request line is rejected before these are set; don't
+        # let it inherit the previous request's on a kept-alive connection
+        self.command = self.path = None
+        return super().parse_request()
+    
+    def send_response(self, code, message=None):
+        self._response_status = code
+        super().send_response(code, message)
+    
+    def handle_one_request(self):
+        self._request_started = None
+        PROFILER.profiled(super().handle_one_request)
+        if self._request_started is not None and self._response_status is not None:
+            finished = time.perf_counter()
+            method = self.command or 'INVALID'
+            route = _route_label(urllib.parse.urlsplit(self.path).path) if self.path else 'other'
+            METRICS.inc('dob_http_requests_total', (method, route, str(self._response_status)))
+            METRICS.observe('dob_http_request_duration_seconds', (method, route),
+                            finished - self._request_started)
+            TRACER.complete(f"{method} {route}", 'http', self._request_started, finished,
+                            {'path': self.path, 'status': self._response_status})
+    
     def do_POST(self):
-        if self.path == '/api/analyze':
-            self._handle_analyze()
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/api/admin/profile':
+            self._handle_profile(urllib.parse.parse_qs(url.query))
+        elif url.path == '/api/analyze/stream':
+            self._handle_analyze_stream()
+        elif url.path == '/api/analyze/batch':
+            self._handle_analyze_batch()
+        elif url.path == '/api/analyze':
+            query = urllib.parse.parse_qs(url.query)
+            if query.get('mode', ['async'])[0] == 'sync':
+                self._handle_analyze_sync()
+            else:
+                self._handle_analyze()
         else:
             self.send_error(404)
     
     def do_GET(self):
-        if self.path.startswith('/api/workflow/'):
-            workflow_id = self.path.split('/')[-1]
-            self._handle_workflow_status(workflow_id)
-        elif self.path == '/api/health':
+        url = urllib.parse.urlsplit(self.path)
+        if url.path.startswith('/api/workflow/') and url.path.endswith('/events'):
+            workflow_id = url.path.split('/')[-2]
+            self._handle_workflow_events(workflow_id, urllib.parse.parse_qs(url.query))
+        elif url.path.startswith('/api/workflow/'):
+            workflow_id = url.path.split('/')[-1]
+            query = urllib.parse.parse_qs(url.query)
+            if 'wait' in query:
+                self._handle_workflow_long_poll(workflow_id, query)
+            else:
+                self._handle_workflow_status(workflow_id)
+        elif url.path == '/api/health':
             self._handle_health_check()
+        elif url.path == '/api/health/live':
+            self._send_json_response({'status': 'alive', 'timestamp': datetime.now().isoformat()})
+        elif url.path == '/api/health/ready':
+            self._handle_readiness_check()
+        elif url.path == '/api/metrics':
+            self._handle_metrics()
+        elif url.path == '/api/stats':
+            self._handle_stats(urllib.parse.parse_qs(url.query))
         else:
             self.send_error(404)
     
     def _handle_health_check(self):
         try:
-            health_data = HealthHandler.handle_health_check()
+            health_data = HealthHandler.handle_health_check(self.workflow_engine)
             self._send_json_response(health_data)
         except Exception as e:
             self._send_error_response(str(e), 500)
     
+    def _handle_readiness_check(self):
+        try:
+            readiness = self.workflow_engine.readiness()
+            self._send_json_response(readiness, 200 if readiness['status'] == 'ready' else 503)
+        except Exception as e:
+            self._send_error_response(str(e), 500)
+    
+    def _handle_profile(self, query):
+        """Capture a profile of the running server; see OnDemandProfiler."""
+        token = os.environ.get('ADMIN_TOKEN')
+        if not token:
+            # Profiling exposes code paths and costs CPU; it stays off without a token
+            self.send_error(404)
+            return
+        supplied = self.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            self._send_error_response("Invalid admin token", 403)
+            return
+        try:
+            seconds = float(query.get('seconds', ['10'])[0])
+            if not math.isfinite(seconds):
+                raise ValueError("seconds must be a finite number")
+            seconds = min(max(seconds, 0.0), PROFILE_MAX_SECONDS)
+            limit = int(query.get('limit', ['60'])[0])
+            body = PROFILER.capture(seconds, query.get('mode', ['sample'])[0], limit).encode('utf-8')
+        except ValueError as e:
+            self._send_error_response(str(e))
+            return
+        except RuntimeError as e:
+            self._send_error_response(str(e), 409)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _handle_stats(self, query):
+        try:
+            stats = self.workflow_engine.analysis_stats.snapshot(query.get('window', [None])[0])
+        except ValueError as e:
+            self._send_error_response(str(e))
+            return
+        self._send_json_response(stats)
+    
+    def _handle_metrics(self):
+        try:
+            body = METRICS.render(self.workflow_engine.metrics_gauges()).encode('utf-8')
+        except Exception as e:
+            self._send_error_response(str(e), 500)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def _handle_analyze(self):
         try:
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode('utf-8'))
+            with TRACER.span('parse', 'http'):
+                content_length = int(self.headers['Content-Length'])
+                post_data = self.rfile.read(content_length)
+                data = json.loads(post_data.decode('utf-8'))
             
-            workflow_id = f"dob_analysis_{int(time.time() * 1000)}"
-            self.workflow_engine.start_workflow(workflow_id, 'analyze_dob', data)
+            retry_after = {'Retry-After': str(self.workflow_engine.admission.retry_after)}
+            if not self.workflow_engine.admit():
+                self._send_error_response("Server is at capacity; retry later", 429, retry_after)
+                return
+            
+            workflow_id = self.workflow_engine.ids.next_id('dob_analysis')
+            with TRACER.span('enqueue', 'workflow', workflow_id=workflow_id):
+                self.workflow_engine.start_workflow(workflow_id, 'analyze_dob', data)
             
             response = {'workflow_id': workflow_id}
             self._send_json_response(response)
             
+        except WorkflowQueueFull as e:
+            self._send_error_response(str(e), 503, retry_after)
         except Exception as e:
             self._send_error_response(str(e))
     
+    def _handle_analyze_sync(self):
+        try:
+            with TRACER.span('parse', 'http'):
+                content_length = int(self.headers['Content-Length'])
+                post_data = self.rfile.read(content_length)
+                data = json.loads(post_data.decode('utf-8'))
+            
+            workflow_id = self.workflow_engine.ids.next_id('dob_analysis')
+            workflow = self.workflow_engine.run_workflow_sync(workflow_id, 'analyze_dob', data)
+            
+            status = 200 if workflow['status'] == 'completed' else 400
+            self._send_json_response(workflow, status)
+            
+        except Exception as e:
+            self._send_error_response(str(e))
+    
+    def _handle_analyze_batch(self):
+        try:
+            with TRACER.span('parse', 'http'):
+                content_length = int(self.headers['Content-Length'])
+                post_data = self.rfile.read(content_length)
+                data = json.loads(post_data.decode('utf-8'))
+            
+            dobs = data.get('dobs') if isinstance(data, dict) else None
+            if not isinstance(dobs, list):
+                raise ValueError("Request body must be an object with a 'dobs' array")
+            if len(dobs) > BATCH_MAX_SIZE:
+                raise ValueError(f"Batch too large: {len(dobs)} items (max {BATCH_MAX_SIZE})")
+            
+            with TRACER.span('analyze_batch', 'workflow', size=len(dobs)):
+                results = self.workflow_engine.analyze_batch(dobs)
+            self._send_json_response(results)
+            
+        except Exception as e:
+            self._send_error_response(str(e))
+    
+    def _handle_analyze_stream(self):
+        """Stream NDJSON results for an NDJSON or CSV upload of any size.
+
+        The request body may be chunked. Results are written as chunked NDJSON
+        while the body is still being read, so clients must read the response
+        concurrently. A client that reads slowly blocks the socket write, which
+        in turn pauses reading and analysis of further input.
+        """
+        try:
+            if 'chunked' in (self.headers.get('Transfer-Encoding') or '').lower():
+                blocks = iter_chunked_body(self.rfile)
+            else:
+                blocks = iter_sized_body(self.rfile, int(self.headers.get('Content-Length') or 0))
+            content_type = (self.headers.get('Content-Type') or '').lower()
+            parse_rows = parse_csv_rows if 'csv' in content_type else parse_ndjson_rows
+            results = self.workflow_engine.analyze_stream(parse_rows(iter_lines(blocks)), STREAM_BATCH_SIZE)
+            first = next(results)
+        except Exception as e:
+            self.close_connection = True
+            self._send_error_response(str(e))
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        
+        pending = [json.dumps(first)]
+        self.connection.settimeout(STREAM_WRITE_TIMEOUT)
+        try:
+            try:
+                for item in results:
+                    pending.append(json.dumps(item))
+                    if len(pending) >= STREAM_BATCH_SIZE:
+                        self._write_chunk(pending)
+                        pending = []
+            except OSError:
+                raise
+            except Exception as e:
+                # Headers are already out; report the failure in-band and stop
+                pending.append(json.dumps({'error': str(e)}))
+                self.close_connection = True
+            self._write_chunk(pending)
+            self.wfile.write(b'0\r\n\r\n')
+        except OSError:
+            # The client disconnected or stopped reading; nothing more can be sent
+            self.close_connection = True
+        finally:
+            self.connection.settimeout(self.timeout)
+    
+    def _write_chunk(self, lines: List[str]):
+        if not lines:
+            return
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+    
     def _handle_workflow_status(self, workflow_id):
         try:
-            workflow = self.workflow_engine.get_workflow_status(workflow_id)
+            encoded = self.workflow_engine.get_workflow_body(workflow_id)
+            if encoded is None:
+                self.send_error(404)
+                return
+            
+            # Pollers revalidate with the version they hold; unchanged workflows cost no body
+            headers = {'ETag': encoded.etag, 'Cache-Control': 'no-cache'}
+            if self._etag_matches(encoded.etag):
+                self.send_response(304)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                return
+            self._send_body(encoded, headers=headers)
+            
+        except Exception as e:
+            self._send_error_response(str(e))
+    
+    def _handle_workflow_long_poll(self, workflow_id, query):
+        try:
+            wait = float(query['wait'][0])
+            if not math.isfinite(wait):
+                raise ValueError("wait must be a finite number")
+            wait = min(max(wait, 0.0), LONG_POLL_MAX_WAIT)
+            since = int(query.get('since', ['-1'])[0])
+            workflow = self.workflow_engine.wait_for_change(workflow_id, since, wait)
             if not workflow:
                 self.send_error(404)
                 return
@@ -241,35 +3018,142 @@ class DOBFactsHandler(http.server.SimpleHTTPRequestHandler):
         except Exception as e:
             self._send_error_response(str(e))
     
+    def _handle_workflow_events(self, workflow_id, query):
+        """Stream workflow changes as Server-Sent Events until the workflow finishes."""
+        try:
+            since = int(self.headers.get('Last-Event-ID') or query.get('since', ['-1'])[0])
+        except ValueError as e:
+            self._send_error_response(str(e))
+            return
+        if not self.workflow_engine.get_workflow_status(workflow_id):
+            self.send_error(404)
+            return
+        
+        # The stream has no length, so it ends by closing the connection
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        # Stop nginx (the ingress) from buffering events
+        self.send_header('X-Accel-Buffering', 'no')
+        self.send_header('Connection', 'close')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        
+        try:
+            while True:
+                workflow = self.workflow_engine.wait_for_change(workflow_id, since, SSE_HEARTBEAT_INTERVAL)
+                if not workflow:
+                    break
+                if workflow['version'] > since:
+                    since = workflow['version']
+                    self.wfile.write(
+                        f"id: {since}\nevent: status\ndata: {json.dumps(workflow)}\n\n".encode('utf-8')
+                    )
+                else:
+                    self.wfile.write(b": keep-alive\n\n")
+                if workflow['status'] != 'running':
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    
     def _send_json_response(self, data, status=200):
+        with TRACER.span('serialize', 'http'):
+            encoded = EncodedBody(data)
+        self._send_body(encoded, status)
+    
+    def _send_body(self, encoded: EncodedBody, status=200, headers=None):
+        body = encoded.body
+        compressible = GZIP_MIN_BYTES > 0 and len(body) >= GZIP_MIN_BYTES
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        if compressible:
+            self.send_header('Vary', 'Accept-Encoding')
+            if self._accepts_gzip():
+                body = encoded.gzipped()
+                self.send_header('Content-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self.wfile.write(body)
+    
+    def _accepts_gzip(self) -> bool:
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = coding.partition(';')
+            if name.strip().lower() in ('gzip', '*'):
+                try:
+                    return float(params.strip().partition('q=')[2] or 1) > 0
+                except ValueError:
+                    return False
+        return False
+    
+    def _etag_matches(self, etag: str) -> bool:
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        return any(tag.strip().removeprefix('W/') == etag.removeprefix('W/') for tag in header.split(','))
     
-    def _send_error_response(self, error_message, status=400):
+    def _send_error_response(self, error_message, status=400, headers=None):
+        error_response = {'error': error_message}
+        body = json.dumps(error_response).encode('utf-8')
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
-        error_response = {'error': error_message}
-        self.wfile.write(json.dumps(error_response).encode('utf-8'))
+        self.wfile.write(body)
 
 def create_handler_with_workflow(workflow_engine):
     def handler(*args, **kwargs):
         return DOBFactsHandler(*args, workflow_engine=workflow_engine, **kwargs)
     return handler
 
+class DOBFactsHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """Thread-per-connection HTTP server with a cap on open connections."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_connections: int = 100):
+        self.max_connections = max_connections
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        # Block the accept loop once the limit is reached; further clients
+        # wait in the listen backlog until a connection closes
+        self._connection_slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._connection_slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._connection_slots.release()
+
+
 if __name__ == '__main__':
     workflow_engine = WorkflowEngine()
     handler = create_handler_with_workflow(workflow_engine)
     
-    PORT = 8000
+    PORT = int(os.environ.get('PORT', 8000))
+    MAX_CONNECTIONS = int(os.environ.get('HTTP_MAX_CONNECTIONS', 100))
     print(f"Starting DOB Facts API server on port {PORT}")
     print("Workflow engine initialized")
     
-    with socketserver.TCPServer(("", PORT), handler) as httpd:
+    with DOBFactsHTTPServer(("", PORT), handler, MAX_CONNECTIONS) as httpd:
         print(f"Server running at http://localhost:{PORT}")
         try:
             httpd.serve_forever()
@@ -4,6 +4,9 @@ import json
 import io
 from unittest.mock import MagicMock, patch
 import io
+import sqlite3
+import threading
+import time
 import http.server
 from backend import server
 
@@ -35,6 +38,7 @@ class MockDOBFactsHandler(server.DOBFactsHandler):
     def __init__(self, workflow_engine):
         self.workflow_engine = workflow_engine
         self.wfile = MockWFile()
+        self.connection = MagicMock()
         self.headers = {}
         self.sent_headers = {}
         self.sent_response = None
@@ -87,6 +91,69 @@ class TestDOBFactsHandler(unittest.TestCase):
         self.assertEqual(self.handler.sent_headers.get('Access-Control-Allow-Origin'), '*')
         self.assertTrue(self.handler.ended_headers)
     
+    def test_handle_analyze_rejects_when_at_capacity(self):
+        self.workflow_engine.admission.admit_queue_depth = 0
+        test_data = json.dumps({'dob': '2000-01-01'}).encode('utf-8')
+        self.handler.rfile = io.BytesIO(test_data)
+        self.handler.headers = {'Content-Length': str(len(test_data))}
+        self.handler._handle_analyze()
+        self.assertEqual(self.handler.sent_response, 429)
+        self.assertEqual(self.handler.sent_headers.get('Retry-After'), '1')
+        self.assertIn('error', json.loads(self.handler.wfile.content))
+        self.assertEqual(len(self.workflow_engine.workflows), 0)
+        self.assertEqual(self.workflow_engine.admission.rejected, 1)
+
+    def test_workflow_status_etag_and_304(self):
+        # Keep the workflow queued so its version cannot move under the test
+        self.workflow_engine.scheduler.submit = MagicMock()
+        self.workflow_engine.start_workflow('etag', 'analyze_dob', {'dob': '2000-01-01'})
+        workflow = self.workflow_engine.workflows.get('etag')
+        self.handler._handle_workflow_status('etag')
+        etag = self.handler.sent_headers['ETag']
+        self.assertEqual(etag, f'W/"{workflow.version}"')
+        self.assertEqual(self.handler.sent_headers['Cache-Control'], 'no-cache')
+        self.assertEqual(json.loads(self.handler.wfile.content)['id'], 'etag')
+
+        self.handler.wfile = MockWFile()
+        self.handler.headers = {'If-None-Match': f'"other", {etag}'}
+        self.handler._handle_workflow_status('etag')
+        self.assertEqual(self.handler.sent_response, 304)
+        self.assertEqual(self.handler.wfile.content, b'')
+
+    def test_large_responses_are_gzipped_when_accepted(self):
+        import gzip
+        data = {'items': ['x' * 100] * 50}
+        self.handler.headers = {'Accept-Encoding': 'br, gzip;q=0.8'}
+        self.handler._send_json_response(data)
+        self.assertEqual(self.handler.sent_headers['Content-Encoding'], 'gzip')
+        self.assertEqual(self.handler.sent_headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(self.handler.wfile.content)), data)
+
+        for accept in ({}, {'Accept-Encoding': 'gzip;q=0'}):
+            self.handler.headers, self.handler.sent_headers, self.handler.wfile = accept, {}, MockWFile()
+            self.handler._send_json_response(data)
+            self.assertNotIn('Content-Encoding', self.handler.sent_headers)
+            self.assertEqual(json.loads(self.handler.wfile.content), data)
+
+        # Small bodies are never compressed
+        self.handler.headers, self.handler.sent_headers = {'Accept-Encoding': 'gzip'}, {}
+        self.handler._send_json_response({'ok': True})
+        self.assertNotIn('Vary', self.handler.sent_headers)
+
+    def test_handle_readiness_check(self):
+        self.handler._handle_readiness_check()
+        self.assertEqual(self.handler.sent_response, 200)
+        self.assertEqual(json.loads(self.handler.wfile.content)['status'], 'ready')
+
+        self.workflow_engine.scheduler.queue_size = MagicMock(return_value=600)
+        self.handler.wfile = MockWFile()
+        self.handler._handle_readiness_check()
+        response = json.loads(self.handler.wfile.content)
+        self.assertEqual(self.handler.sent_response, 503)
+        self.assertEqual(response['status'], 'unready')
+        self.assertEqual(response['load']['queue_depth'], 600)
+        self.assertTrue(response['reasons'][0].startswith('queue depth 600'))
+
     def test_handle_analyze_invalid_json(self):
         # Prepare invalid JSON data
         test_data = b'invalid json'
@@ -139,6 +206,113 @@ class TestDOBFactsHandler(unittest.TestCase):
         self.assertEqual(self.handler.sent_headers.get('Content-Type'), 'application/json')
         self.assertEqual(self.handler.sent_headers.get('Access-Control-Allow-Origin'), '*')
     
+    def test_analyze_sync_mode(self):
+        test_data = json.dumps({'dob': '2000-01-01'}).encode('utf-8')
+        self.handler.rfile = io.BytesIO(test_data)
+        self.handler.headers = {'Content-Length': str(len(test_data))}
+        self.handler.path = '/api/analyze?mode=sync'
+        
+        self.handler.do_POST()
+        response = json.loads(self.handler.wfile.content)
+        
+        self.assertEqual(self.handler.sent_response, 200)
+        self.assertEqual(response['status'], 'completed')
+        self.assertEqual(response['current_step'], len(response['steps']))
+        self.assertEqual(response['results']['zodiac']['western'], 'Capricorn')
+        self.assertIn('fun_facts', response['results'])
+    
+    def test_analyze_sync_mode_invalid_date(self):
+        test_data = json.dumps({'dob': 'not-a-date'}).encode('utf-8')
+        self.handler.rfile = io.BytesIO(test_data)
+        self.handler.headers = {'Content-Length': str(len(test_data))}
+        self.handler.path = '/api/analyze?mode=sync'
+        
+        self.handler.do_POST()
+        response = json.loads(self.handler.wfile.content)
+        
+        self.assertEqual(self.handler.sent_response, 400)
+        self.assertEqual(response['status'], 'failed')
+        self.assertIn('Invalid date format', response['error'])
+    
+    def test_analyze_batch(self):
+        test_data = json.dumps({'dobs': ['2000-01-01', 'bad', '1990-07-15']}).encode('utf-8')
+        self.handler.rfile = io.BytesIO(test_data)
+        self.handler.headers = {'Content-Length': str(len(test_data))}
+        self.handler.path = '/api/analyze/batch'
+        
+        self.handler.do_POST()
+        response = json.loads(self.handler.wfile.content)
+        
+        self.assertEqual(self.handler.sent_response, 200)
+        self.assertEqual(response['summary']['count'], 3)
+        self.assertEqual(response['summary']['failed'], 1)
+        self.assertEqual(response['errors'][0]['index'], 1)
+        self.assertEqual(response['items'][0]['results']['zodiac']['western'], 'Capricorn')
+        self.assertEqual(response['items'][2]['results']['day_info']['day_of_week'], 'Sunday')
+    
+    def test_analyze_batch_requires_array(self):
+        test_data = json.dumps({'dob': '2000-01-01'}).encode('utf-8')
+        self.handler.rfile = io.BytesIO(test_data)
+        self.handler.headers = {'Content-Length': str(len(test_data))}
+        self.handler.path = '/api/analyze/batch'
+        
+        self.handler.do_POST()
+        self.assertEqual(self.handler.sent_response, 400)
+        self.assertIn('dobs', json.loads(self.handler.wfile.content)['error'])
+    
+    def _decode_chunked(self, raw):
+        body = io.BytesIO(raw)
+        return b''.join(server.iter_chunked_body(body))
+    
+    def test_analyze_stream_chunked_ndjson(self):
+        lines = b'"2000-01-01"\n{"dob": "1990-07-15"}\nnot json\n\n"bad-date"\n'
+        # Split the upload across chunks mid-line
+        chunked = b''.join(b'%X\r\n%s\r\n' % (len(part), part) for part in (lines[:7], lines[7:30], lines[30:]))
+        self.handler.rfile = io.BytesIO(chunked + b'0\r\n\r\n')
+        self.handler.headers = {'Transfer-Encoding': 'chunked', 'Content-Type': 'application/x-ndjson'}
+        self.handler.path = '/api/analyze/stream'
+        
+        self.handler.do_POST()
+        
+        self.assertEqual(self.handler.sent_response, 200)
+        self.assertEqual(self.handler.sent_headers.get('Transfer-Encoding'), 'chunked')
+        records = [json.loads(line) for line in self._decode_chunked(self.handler.wfile.content).splitlines()]
+        items, summary = records[:-1], records[-1]['summary']
+        self.assertEqual([item['index'] for item in items], [0, 1, 2, 3])
+        self.assertEqual(items[0]['results']['zodiac']['western'], 'Capricorn')
+        self.assertEqual(items[1]['results']['validated_dob'], '1990-07-15')
+        self.assertIn('Invalid JSON', items[2]['error'])
+        self.assertIn('Invalid date format', items[3]['error'])
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['failed'], 2)
+    
+    def test_analyze_stream_csv(self):
+        test_data = b'name,dob\r\nann,2000-01-01\r\nbob,1990-07-15\r\n'
+        self.handler.rfile = io.BytesIO(test_data)
+        self.handler.headers = {'Content-Length': str(len(test_data)), 'Content-Type': 'text/csv'}
+        self.handler.path = '/api/analyze/stream'
+        
+        self.handler.do_POST()
+        
+        records = [json.loads(line) for line in self._decode_chunked(self.handler.wfile.content).splitlines()]
+        self.assertEqual([r['results']['validated_dob'] for r in records[:-1]], ['2000-01-01', '1990-07-15'])
+        self.assertEqual(records[-1]['summary']['succeeded'], 2)
+    
+    def test_analyze_stream_stops_when_the_client_stops_reading(self):
+        test_data = b'\n'.join(b'"2000-01-01"' for _ in range(5)) + b'\n'
+        self.handler.rfile = io.BytesIO(test_data)
+        self.handler.headers = {'Content-Length': str(len(test_data))}
+        self.handler.path = '/api/analyze/stream'
+        self.handler.wfile = MagicMock()
+        self.handler.wfile.write.side_effect = TimeoutError('timed out')
+        
+        with patch.object(server, 'STREAM_BATCH_SIZE', 2):
+            self.handler.do_POST()
+        
+        self.assertTrue(self.handler.close_connection)
+        self.assertEqual(self.handler.wfile.write.call_count, 1)
+        self.handler.connection.settimeout.assert_any_call(server.STREAM_WRITE_TIMEOUT)
+    
     @patch('http.server.SimpleHTTPRequestHandler.__init__')
     def test_handle_health_check(self, mock_init):
         mock_init.return_value = None
@@ -268,6 +442,1329 @@ class TestWorkflowEngine(unittest.TestCase):
         self.assertIn('numerology', status['results'])
         self.assertIn('day_info', status['results'])
         self.assertIn('fun_facts', status['results'])
+        self.assertIsNotNone(status['queue_wait_ms'])
+
+    def test_batch_matches_single_path(self):
+        import random
+        rng = random.Random(7)
+        start, end = date(1900, 1, 1).toordinal(), date.today().toordinal()
+        dobs = [date.fromordinal(rng.randint(start, end)).isoformat() for _ in range(300)]
+        dobs += ['2000-02-29', '1999-12-31', '2000-13-01', '', None, date.today().isoformat()]
+        batch = self.engine.analyze_batch(dobs)
+        for i, dob in enumerate(dobs):
+            single = self.engine.run_workflow_sync(f'single_{i}', 'analyze_dob', {'dob': dob})
+            item = batch['items'][i]
+            if single['status'] == 'completed':
+                self.assertEqual(item['results'], single['results'], dob)
+            elif isinstance(dob, str):
+                self.assertEqual(item['error'], single['error'], dob)
+            else:
+                self.assertEqual(item['status'], 'failed')
+
+    def test_analyze_stream_is_lazy(self):
+        import itertools
+        consumed = []
+
+        def rows():
+            for i in itertools.count():
+                consumed.append(i)
+                yield '2000-01-01', None
+
+        items = list(itertools.islice(self.engine.analyze_stream(rows(), batch_size=10), 15))
+        self.assertEqual([item['index'] for item in items], list(range(15)))
+        # Only the batches needed so far have been pulled from the input
+        self.assertEqual(len(consumed), 20)
+
+    def test_zero_step_delay(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        workflow_id = engine.start_workflow('fast', 'analyze_dob', {'dob': '2000-01-01'})
+        deadline = time.monotonic() + 2
+        while engine.get_workflow_status(workflow_id)['status'] == 'running' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(engine.get_workflow_status(workflow_id)['status'], 'completed')
+
+    def test_negative_step_delay_rejected(self):
+        with self.assertRaises(ValueError):
+            server.WorkflowEngine(step_delay=-1)
+
+class TestWorkflowScheduler(unittest.TestCase):
+    def test_runs_items_on_fixed_pool(self):
+        import threading
+        seen = []
+        done = threading.Event()
+
+        def target(item):
+            seen.append((item, threading.current_thread().name))
+            if len(seen) == 10:
+                done.set()
+
+        scheduler = server.WorkflowScheduler(target, max_workers=2, queue_depth=20)
+        for i in range(10):
+            scheduler.submit(i)
+        self.assertTrue(done.wait(5))
+        self.assertEqual(sorted(item for item, _ in seen), list(range(10)))
+        self.assertLessEqual(len({name for _, name in seen}), 2)
+        self.assertEqual(len(scheduler.workers), 2)
+
+    def test_rejects_when_queue_full(self):
+        import threading
+        release = threading.Event()
+        scheduler = server.WorkflowScheduler(lambda item: release.wait(5), max_workers=1, queue_depth=1)
+        scheduler.submit('running')
+        # Wait for the single worker to pick up the first item
+        while scheduler.queue_size():
+            time.sleep(0.01)
+        scheduler.submit('queued')
+        with self.assertRaises(server.WorkflowQueueFull):
+            scheduler.submit('rejected')
+        release.set()
+
+    def test_worker_logs_and_survives_failures(self):
+        done = threading.Event()
+
+        def target(item):
+            if item == 'bad':
+                raise RuntimeError('boom')
+            done.set()
+
+        scheduler = server.WorkflowScheduler(target, max_workers=1, queue_depth=2)
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            scheduler.submit('bad')
+            scheduler.submit('good')
+            self.assertTrue(done.wait(5))
+        self.assertIn("failed on 'bad'", stderr.getvalue())
+        self.assertIn('RuntimeError: boom', stderr.getvalue())
+
+    def test_engine_fails_workflow_when_processing_raises(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        engine.scheduler.submit = MagicMock()
+        engine.start_workflow('broken', 'analyze_dob', {'dob': '2000-01-01'})
+        with patch.object(engine.workflows, 'claim', side_effect=RuntimeError('store down')), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            engine._process_workflow(('broken', time.monotonic()))
+        status = engine.get_workflow_status('broken')
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('store down', status['error'])
+        self.assertIn('RuntimeError: store down', stderr.getvalue())
+
+    def test_rejects_unbounded_queue(self):
+        with self.assertRaises(ValueError):
+            server.WorkflowScheduler(lambda item: None, queue_depth=0)
+
+    def test_claim_loop_logs_store_failures(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        with patch.object(engine.workflows, 'claim_next', side_effect=sqlite3.OperationalError('no such table')), \
+                patch('time.sleep', side_effect=[None, KeyboardInterrupt]), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            with self.assertRaises(KeyboardInterrupt):
+                engine._claim_loop()
+        self.assertEqual(stderr.getvalue().count('OperationalError: no such table'), 2)
+
+    def test_engine_drops_rejected_workflow(self):
+        engine = server.WorkflowEngine(max_workers=1, queue_depth=1)
+        engine.scheduler.submit = MagicMock(side_effect=server.WorkflowQueueFull('full'))
+        with self.assertRaises(server.WorkflowQueueFull):
+            engine.start_workflow('rejected', 'analyze_dob', {'dob': '2000-01-01'})
+        self.assertEqual(engine.get_workflow_status('rejected'), {})
+
+
+class TestWorkflowStore(unittest.TestCase):
+    def _record(self, workflow_id, finished=True):
+        record = server.WorkflowRecord(workflow_id, 'analyze_dob', ['complete'], {'dob': '2000-01-01'})
+        if finished:
+            record.finish('completed')
+        return record
+
+    def test_record_dict_access_and_snapshot(self):
+        record = self._record('wf', finished=False)
+        record['results']['validated_dob'] = '2000-01-01'
+        self.assertEqual(record['data']['dob'], '2000-01-01')
+        with self.assertRaises(KeyError):
+            record['missing']
+        snapshot = record.to_dict()
+        self.assertEqual(snapshot['status'], 'running')
+        self.assertNotIn('error', snapshot)
+        record.finish('failed', 'boom')
+        self.assertEqual(record.to_dict()['error'], 'boom')
+        self.assertFalse(hasattr(record, '__dict__'))
+
+    def test_evicts_least_recently_used_finished(self):
+        store = server.WorkflowStore(max_size=2)
+        store['a'] = self._record('a')
+        store['b'] = self._record('b')
+        store.get('a')
+        store['c'] = self._record('c')
+        self.assertIn('a', store)
+        self.assertNotIn('b', store)
+        self.assertEqual(store.evictions, 1)
+
+    def test_never_evicts_running(self):
+        store = server.WorkflowStore(max_size=1)
+        store['a'] = self._record('a', finished=False)
+        store['b'] = self._record('b', finished=False)
+        self.assertEqual(len(store), 2)
+
+    def test_ttl_expires_finished(self):
+        store = server.WorkflowStore(ttl_seconds=60)
+        store['done'] = self._record('done')
+        store['running'] = self._record('running', finished=False)
+        store['done'].finished_at -= 120
+        self.assertEqual(store.evict_expired(), 1)
+        self.assertIsNone(store.get('done'))
+        self.assertIn('running', store)
+
+    def test_stats(self):
+        store = server.WorkflowStore()
+        store['a'] = self._record('a')
+        store['b'] = self._record('b', finished=False)
+        stats = store.stats()
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual(stats['running'], 1)
+        self.assertGreater(stats['approx_bytes'], 0)
+
+
+    def test_encoded_snapshot_is_reused_until_next_version(self):
+        record = self._record('wf', finished=False)
+        first = record.encoded_snapshot()
+        self.assertIs(record.encoded_snapshot(), first)
+        record.version += 1
+        second = record.encoded_snapshot()
+        self.assertIsNot(second, first)
+        self.assertEqual(json.loads(second.body)['version'], 1)
+        self.assertIs(second.gzipped(), second.gzipped())
+
+    def test_add_refuses_existing_id(self):
+        store = server.WorkflowStore()
+        first = self._record('a', finished=False)
+        self.assertTrue(store.add('a', first))
+        self.assertFalse(store.add('a', self._record('a')))
+        self.assertIs(store.get('a'), first)
+
+    def test_large_store_is_sharded(self):
+        store = server.WorkflowStore(max_size=4096, shards=8)
+        for i in range(100):
+            store[f'wf_{i}'] = self._record(f'wf_{i}')
+        stats = store.stats()
+        self.assertEqual(stats['shards'], 8)
+        self.assertEqual(stats['entries'], 100)
+        self.assertTrue(all(f'wf_{i}' in store for i in range(100)))
+        # Each shard evicts against its own share of max_size
+        store = server.WorkflowStore(max_size=512, shards=2)
+        for i in range(2000):
+            store[f'wf_{i}'] = self._record(f'wf_{i}')
+        self.assertLessEqual(len(store), 512)
+        self.assertEqual(store.evictions, 2000 - len(store))
+
+
+class TestAdmissionPolicy(unittest.TestCase):
+    def test_defaults_trip_readiness_before_admission(self):
+        with patch.dict('os.environ', {}):
+            policy = server.AdmissionPolicy(queue_capacity=1000, workers=4)
+        self.assertEqual(policy.thresholds(), {'ready_queue_depth': 500, 'ready_in_flight': 504,
+                                               'admit_queue_depth': 900, 'admit_in_flight': 904})
+        self.assertEqual(policy.unready_reasons(100, 104), [])
+        self.assertEqual(len(policy.unready_reasons(500, 504)), 2)
+        self.assertTrue(policy.admits(500, 504))
+        self.assertFalse(policy.admits(900, 904))
+        self.assertEqual(policy.rejected, 1)
+
+    def test_in_flight_limit_applies_on_its_own(self):
+        policy = server.AdmissionPolicy(1000, 4, ready_in_flight=10, admit_in_flight=20)
+        self.assertEqual(policy.unready_reasons(0, 10), ['in-flight workflows 10 >= 10'])
+        self.assertFalse(policy.admits(0, 20))
+
+    def test_tiny_queues_still_admit_when_idle(self):
+        with patch.dict('os.environ', {}):
+            policy = server.AdmissionPolicy(queue_capacity=1, workers=1)
+        self.assertEqual(policy.unready_reasons(0, 0), [])
+        self.assertTrue(policy.admits(0, 0))
+        self.assertFalse(policy.admits(1, 1))
+
+    def test_thresholds_from_environment(self):
+        with patch.dict('os.environ', {'READY_MAX_QUEUE_DEPTH': '7', 'ADMIT_RETRY_AFTER': '5'}):
+            policy = server.AdmissionPolicy(1000, 4)
+        self.assertEqual(policy.ready_queue_depth, 7)
+        self.assertEqual(policy.ready_in_flight, 11)
+        self.assertEqual(policy.retry_after, 5)
+
+
+class TestCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.engine = server.WorkflowEngine(step_delay=0.05, result_cache=server.ResultCache(0))
+
+    def wait_for(self, workflow_ids, timeout=10):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            statuses = [self.engine.get_workflow_status(wid) for wid in workflow_ids]
+            if all(status['status'] != 'running' for status in statuses):
+                return statuses
+            time.sleep(0.02)
+        self.fail("workflows did not finish")
+
+    def test_identical_submissions_share_one_computation(self):
+        steps_run = []
+        original = self.engine._calculate_age
+        self.engine.step_graphs['analyze_dob']['calculate_age'].handler = \
+            lambda workflow: (steps_run.append(workflow.id), original(workflow))
+        ids = [f'same_{i}' for i in range(5)]
+        for workflow_id in ids:
+            self.engine.start_workflow(workflow_id, 'analyze_dob', {'dob': '1990-05-15'})
+        self.engine.start_workflow('other', 'analyze_dob', {'dob': '1985-01-01'})
+        statuses = self.wait_for(ids + ['other'])
+
+        self.assertEqual(sorted(steps_run), ['other', 'same_0'])
+        self.assertEqual([status['id'] for status in statuses[:5]], ids)
+        self.assertTrue(all(status['status'] == 'completed' for status in statuses))
+        self.assertTrue(all(status['results'] == statuses[0]['results'] for status in statuses[:5]))
+        self.assertTrue(all(info['status'] == 'completed' for info in statuses[4]['step_status'].values()))
+        stats = self.engine.coalescing_stats()
+        self.assertEqual(stats['coalesced'], 4)
+        self.assertEqual(stats['steps_saved'], 4 * len(self.engine.workflow_steps['analyze_dob']))
+        self.assertEqual((stats['leaders_in_flight'], stats['followers_waiting']), (0, 0))
+
+        # Once the leader is done, the same DOB starts a fresh computation
+        self.engine.start_workflow('later', 'analyze_dob', {'dob': '1990-05-15'})
+        self.wait_for(['later'])
+        self.assertEqual(steps_run[-1], 'later')
+
+    def test_followers_share_the_leaders_failure(self):
+        self.engine.start_workflow('bad_leader', 'analyze_dob', {'dob': 'not-a-date'})
+        self.engine.start_workflow('bad_follower', 'analyze_dob', {'dob': 'not-a-date'})
+        leader, follower = self.wait_for(['bad_leader', 'bad_follower'])
+        self.assertEqual(follower['status'], 'failed')
+        self.assertEqual(follower['error'], leader['error'])
+
+    def test_followers_run_alone_if_leader_is_taken_elsewhere(self):
+        submit = self.engine.scheduler.submit
+        self.engine.scheduler.submit = MagicMock()
+        self.engine.start_workflow('leader', 'analyze_dob', {'dob': '2001-09-09'})
+        self.engine.start_workflow('follower', 'analyze_dob', {'dob': '2001-09-09'})
+        self.engine.scheduler.submit = submit
+        claim = self.engine.workflows.claim
+        with patch.object(self.engine.workflows, 'claim',
+                          side_effect=lambda wid, *args: None if wid == 'leader' else claim(wid, *args)):
+            self.engine._advance_workflow('leader', time.monotonic())
+            follower, = self.wait_for(['follower'])
+        self.assertEqual(follower['status'], 'completed')
+        self.assertEqual(self.engine.coalescing_stats()['followers_waiting'], 0)
+
+    def test_follower_joining_while_the_leader_finishes_keeps_the_final_state(self):
+        self.engine.scheduler.submit = MagicMock()
+        self.engine.start_workflow('leader', 'analyze_dob', {'dob': '1966-06-06'})
+        leader = self.engine.workflows.get('leader')
+        mirror = self.engine._mirror
+        finisher = threading.Thread(target=lambda: (self.engine._run_steps(leader, 0),
+                                                    self.engine._publish(leader)))
+
+        def mirror_while_leader_finishes(follower, snapshot):
+            if not finisher.is_alive() and not leader.is_finished:
+                # The leader's worker publishes its remaining steps in the middle of the join
+                finisher.start()
+                finisher.join(0.2)
+            mirror(follower, snapshot)
+
+        with patch.object(self.engine, '_mirror', side_effect=mirror_while_leader_finishes):
+            self.engine.start_workflow('follower', 'analyze_dob', {'dob': '1966-06-06'})
+            finisher.join(5)
+        leader_status, follower_status = self.wait_for(['leader', 'follower'])
+        self.assertEqual(follower_status['status'], 'completed')
+        self.assertEqual(follower_status['results'], leader_status['results'])
+        # What gets journaled and saved, not just what was last published
+        self.assertEqual(self.engine.workflows.get('follower').to_dict()['results'], leader_status['results'])
+        self.assertEqual(self.engine.analysis_stats.snapshot()['analyses'], 2)
+
+    def test_followers_are_released_if_the_leader_raises(self):
+        submit = self.engine.scheduler.submit
+        self.engine.scheduler.submit = MagicMock()
+        self.engine.start_workflow('leader', 'analyze_dob', {'dob': '1977-03-03'})
+        self.engine.start_workflow('follower', 'analyze_dob', {'dob': '1977-03-03'})
+        self.engine.scheduler.submit = submit
+        claim = self.engine.workflows.claim
+
+        def flaky_claim(workflow_id, *args):
+            if workflow_id == 'leader':
+                raise sqlite3.OperationalError('database is locked')
+            return claim(workflow_id, *args)
+
+        with patch.object(self.engine.workflows, 'claim', side_effect=flaky_claim), \
+                patch('sys.stderr', new_callable=io.StringIO):
+            self.engine._process_workflow(('leader', time.monotonic()))
+            leader, follower = self.wait_for(['leader', 'follower'])
+        self.assertEqual(leader['status'], 'failed')
+        self.assertIn('database is locked', leader['error'])
+        self.assertEqual(follower['status'], 'completed')
+        stats = self.engine.coalescing_stats()
+        self.assertEqual((stats['leaders_in_flight'], stats['followers_waiting']), (0, 0))
+
+        self.engine.start_workflow('later', 'analyze_dob', {'dob': '1977-03-03'})
+        later, = self.wait_for(['later'])
+        self.assertEqual(later['status'], 'completed')
+
+
+class TestWorkflowIdGenerator(unittest.TestCase):
+    def test_ids_increase_even_if_clock_stalls_or_goes_back(self):
+        now = [1700000000.0]
+        ids = server.WorkflowIdGenerator('node1', clock=lambda: now[0])
+        generated = [ids.next_id('wf') for _ in range(5000)]
+        now[0] -= 10
+        generated += [ids.next_id('wf') for _ in range(10)]
+        self.assertEqual(len(set(generated)), len(generated))
+        self.assertEqual(generated, sorted(generated))
+        self.assertTrue(generated[0].startswith('wf_'))
+        self.assertTrue(generated[0].endswith('_node1'))
+
+    def test_replicas_get_distinct_tags(self):
+        with patch.dict('os.environ', {}, clear=False) as env:
+            env.pop('WORKFLOW_NODE_ID', None)
+            self.assertNotEqual(server.WorkflowIdGenerator().node, server.WorkflowIdGenerator().node)
+            env['WORKFLOW_NODE_ID'] = 'replica-a'
+            self.assertEqual(server.WorkflowIdGenerator().node, 'replica-a')
+
+    def test_unique_across_threads(self):
+        ids = server.WorkflowIdGenerator('node1')
+        generated = []
+
+        def generate():
+            generated.extend(ids.next_id('wf') for _ in range(2000))
+
+        threads = [threading.Thread(target=generate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(generated)), 8 * 2000)
+
+
+class TestConcurrentSubmission(unittest.TestCase):
+    def test_many_submitters_and_readers(self):
+        engine = server.WorkflowEngine(max_workers=4, queue_depth=10000, step_delay=0,
+                                       result_cache=server.ResultCache(0))
+        submitters, per_submitter = 16, 100
+        submitted = []
+        errors = []
+        done = threading.Event()
+
+        def submit():
+            try:
+                for i in range(per_submitter):
+                    workflow_id = engine.ids.next_id('dob_analysis')
+                    engine.start_workflow(workflow_id, 'analyze_dob', {'dob': f'19{50 + i % 50}-03-14'})
+                    submitted.append(workflow_id)
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            # Readers serialize running workflows while workers advance them
+            try:
+                while not done.is_set():
+                    for workflow_id in submitted[-20:]:
+                        status = engine.get_workflow_status(workflow_id)
+                        json.dumps(status)
+                        if status['status'] == 'completed':
+                            self.assertEqual(status['current_step'], len(status['steps']))
+                            self.assertIn('fun_facts', status['results'])
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        threads = [threading.Thread(target=submit) for _ in range(submitters)]
+        for thread in readers + threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        deadline = time.time() + 30
+        while time.time() < deadline and any(
+                engine.get_workflow_status(wid)['status'] == 'running' for wid in submitted):
+            time.sleep(0.05)
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(submitted)), submitters * per_submitter)
+        self.assertEqual(len(engine.workflows), submitters * per_submitter)
+        self.assertTrue(all(engine.get_workflow_status(wid)['status'] == 'completed' for wid in submitted))
+
+    def test_duplicate_id_is_rejected(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        engine.start_workflow('same', 'analyze_dob', {'dob': '2000-01-01'})
+        with self.assertRaises(ValueError):
+            engine.start_workflow('same', 'analyze_dob', {'dob': '1990-01-01'})
+        self.assertEqual(engine.get_workflow_status('same')['data'], {'dob': '2000-01-01'})
+
+
+class TestWorkflowStepGraph(unittest.TestCase):
+    def _wait(self, engine, workflow_id, timeout=5):
+        deadline = time.monotonic() + timeout
+        status = engine.get_workflow_status(workflow_id)
+        while status['status'] == 'running' and time.monotonic() < deadline:
+            time.sleep(0.01)
+            status = engine.get_workflow_status(workflow_id)
+        return status
+
+    def test_independent_steps_run_concurrently(self):
+        engine = server.WorkflowEngine(step_delay=0.1)
+        started = time.monotonic()
+        engine.start_workflow('dag', 'analyze_dob', {'dob': '2000-01-01'})
+        status = self._wait(engine, 'dag')
+        elapsed = time.monotonic() - started
+        self.assertEqual(status['status'], 'completed')
+        # Critical path is validate -> age -> fun facts -> complete: 4 delays, not 7
+        self.assertLess(elapsed, 0.6)
+        for step in status['steps']:
+            self.assertEqual(status['step_status'][step]['status'], 'completed')
+            self.assertGreaterEqual(status['step_status'][step]['duration_ms'], 100)
+        self.assertEqual(status['current_step'], len(status['steps']))
+
+    def test_register_custom_workflow_type(self):
+        engine = server.WorkflowEngine(step_delay=0.01)
+        engine.register_workflow_type('echo', [
+            server.WorkflowStep('copy', lambda wf: wf['results'].update(echo=wf['data']['value'])),
+            server.WorkflowStep('shout', lambda wf: wf['results'].update(shout=wf['results']['echo'].upper()),
+                                ['copy']),
+            server.WorkflowStep('complete', None, ['shout'])
+        ])
+        engine.start_workflow('echo1', 'echo', {'value': 'hi'})
+        status = self._wait(engine, 'echo1')
+        self.assertEqual(status['steps'], ['copy', 'shout', 'complete'])
+        self.assertEqual(status['results'], {'echo': 'hi', 'shout': 'HI'})
+
+    def test_register_rejects_unknown_or_later_dependency(self):
+        engine = server.WorkflowEngine()
+        with self.assertRaises(ValueError):
+            engine.register_workflow_type('bad', [server.WorkflowStep('a', None, ['b']),
+                                                  server.WorkflowStep('b')])
+        with self.assertRaises(ValueError):
+            engine.register_workflow_type('dup', [server.WorkflowStep('a'), server.WorkflowStep('a')])
+
+    def test_failed_step_reported(self):
+        engine = server.WorkflowEngine(step_delay=0.01)
+        engine.start_workflow('bad', 'analyze_dob', {'dob': 'nope'})
+        status = self._wait(engine, 'bad')
+        self.assertEqual(status['status'], 'failed')
+        self.assertEqual(status['step_status']['validate_date']['status'], 'failed')
+        self.assertEqual(status['step_status']['calculate_age']['status'], 'pending')
+
+    def test_wait_for_change(self):
+        import threading
+        engine = server.WorkflowEngine(step_delay=0)
+        record = server.WorkflowRecord('w', 'analyze_dob', engine.workflow_steps['analyze_dob'], {'dob': '2000-01-01'})
+        engine.workflows['w'] = record
+        # Times out with the same version when nothing changes
+        started = time.monotonic()
+        self.assertEqual(engine.wait_for_change('w', 0, 0.1)['version'], 0)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        threading.Timer(0.05, engine._set_step_state, (record, 'validate_date', 'running')).start()
+        self.assertEqual(engine.wait_for_change('w', 0, 5)['version'], 1)
+        self.assertEqual(engine._watches, {})
+        self.assertEqual(engine.wait_for_change('missing', 0, 5), {})
+        with self.assertRaises(ValueError):
+            engine.wait_for_change('w', 10, float('nan'))
+
+    def test_unknown_workflow_type_fails(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        status = engine.run_workflow_sync('x', 'nope', {})
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('Unknown workflow type', status['error'])
+
+
+class TestCalendarIndex(unittest.TestCase):
+    def _expected(self, day):
+        import calendar
+        key = day.month * 100 + day.day
+        western = next(sign for limit, sign in server.ZODIAC_SIGNS if key <= limit)
+        life_path = sum(int(digit) for digit in day.strftime('%Y%m%d'))
+        while life_path > 9 and life_path not in [11, 22, 33]:
+            life_path = sum(int(digit) for digit in str(life_path))
+        return (western, server.CHINESE_ZODIAC[day.year % 12], life_path,
+                day.weekday(), calendar.day_name[day.weekday()])
+
+    def test_matches_direct_computation(self):
+        index = server.CalendarIndex(first_year=1999, last_year=2001)
+        start = date(1998, 12, 1).toordinal()
+        for ordinal in range(start, date(2002, 1, 31).toordinal()):
+            day = date.fromordinal(ordinal)
+            self.assertEqual(tuple(index.lookup(day)), self._expected(day), day)
+
+    def test_builds_years_lazily(self):
+        index = server.CalendarIndex(first_year=1900, last_year=2200)
+        self.assertEqual(len(index), 0)
+        index.lookup(date(2000, 6, 1))
+        self.assertEqual(len(index), 366)
+        # Out-of-range years are computed without being stored
+        index.lookup(date(1850, 6, 1))
+        self.assertEqual(len(index), 366)
+
+    def test_steps_reuse_parsed_dob(self):
+        engine = server.WorkflowEngine()
+        workflow = server.WorkflowRecord('wf', 'analyze_dob', [], {'dob': '2000-01-01'})
+        engine._validate_date(workflow)
+        self.assertEqual(workflow.parsed_dob, date(2000, 1, 1))
+        self.assertNotIn('parsed_dob', workflow.to_dict())
+
+
+class TestSQLiteWorkflowStore(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = f"{self.tmpdir.name}/workflows.db"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _store(self, **kwargs):
+        return server.SQLiteWorkflowStore(self.path, **kwargs)
+
+    def _wait(self, engine, workflow_id, timeout=5):
+        deadline = time.monotonic() + timeout
+        status = engine.get_workflow_status(workflow_id)
+        while status.get('status') == 'running' and time.monotonic() < deadline:
+            time.sleep(0.02)
+            status = engine.get_workflow_status(workflow_id)
+        return status
+
+    def test_round_trips_records(self):
+        store = self._store()
+        record = server.WorkflowRecord('wf', 'analyze_dob', ['a', 'b'], {'dob': '2000-01-01'})
+        record.step_states['a'] = 'completed'
+        record.step_durations['a'] = 1.5
+        store['wf'] = record
+        loaded = store.get('wf')
+        self.assertEqual(loaded.to_dict(), record.to_dict())
+        self.assertIn('wf', store)
+        self.assertEqual(store.stats()['entries'], 1)
+        del store['wf']
+        self.assertIsNone(store.get('wf'))
+
+    def test_claims_are_exclusive_until_lease_expires(self):
+        store = self._store()
+        store['wf'] = server.WorkflowRecord('wf', 'analyze_dob', [], {})
+        record = store.claim('wf', 'replica-a', lease_seconds=30)
+        self.assertIsNotNone(record)
+        self.assertIsNone(store.claim('wf', 'replica-b', lease_seconds=30))
+        store.save(record, 'replica-a', 0)
+        # replica-a's lease has now lapsed, so replica-b may take over
+        time.sleep(0.01)
+        self.assertIsNotNone(store.claim('wf', 'replica-b', lease_seconds=30))
+        with self.assertRaises(server.WorkflowLeaseLost):
+            store.save(record, 'replica-a', 30)
+
+    def test_replicas_share_workflows(self):
+        replica_a = server.WorkflowEngine(store=self._store(), step_delay=0.01)
+        replica_b = server.WorkflowEngine(store=self._store(), step_delay=0.01)
+        replica_a.start_workflow('shared', 'analyze_dob', {'dob': '2000-01-01'})
+        status = replica_b.wait_for_change('shared', 10 ** 6, 5)
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['results']['zodiac']['western'], 'Capricorn')
+
+    def test_idle_replica_claims_unstarted_work(self):
+        # As if a replica accepted the workflow and died before running it
+        self._store()['orphan'] = server.WorkflowRecord(
+            'orphan', 'analyze_dob', ['validate_date', 'complete'], {'dob': '2000-01-01'})
+        replica_b = server.WorkflowEngine(store=self._store(claim_grace=0), step_delay=0.01)
+        status = self._wait(replica_b, 'orphan')
+        self.assertEqual(status['status'], 'completed')
+
+    def test_evicts_finished_beyond_max_size(self):
+        store = self._store(max_size=2)
+        for name in ('a', 'b', 'c'):
+            record = server.WorkflowRecord(name, 'analyze_dob', [], {})
+            record.finish('completed')
+            store[name] = record
+            time.sleep(0.01)
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get('a'))
+
+    def test_backend_selected_from_env(self):
+        with patch.dict('os.environ', {'WORKFLOW_STATE_BACKEND': 'sqlite', 'WORKFLOW_SQLITE_PATH': self.path}):
+            self.assertIsInstance(server.create_workflow_store(), server.SQLiteWorkflowStore)
+        with patch.dict('os.environ', {'WORKFLOW_STATE_BACKEND': 'nope'}):
+            with self.assertRaises(ValueError):
+                server.create_workflow_store()
+
+
+class TestWorkflowJournal(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = f"{self.tmpdir.name}/journal.log"
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _snapshot(self, workflow_id, version, status='running'):
+        return {'id': workflow_id, 'version': version, 'status': status}
+
+    def test_group_commits_and_replays_latest(self):
+        import threading
+        journal = server.WorkflowJournal(self.path, flush_interval=0.02)
+        threads = [threading.Thread(target=lambda n=n: [journal.append(self._snapshot(f'wf{n}', v))
+                                                        for v in range(20)])
+                   for n in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(journal.flush(5))
+        self.assertEqual(journal.entries_written, 100)
+        self.assertLess(journal.batches_written, 100)
+        replayed = {snapshot['id']: snapshot['version'] for snapshot in journal.replay()}
+        self.assertEqual(replayed, {f'wf{n}': 19 for n in range(5)})
+
+    def test_writer_survives_failed_reopen_after_compaction(self):
+        import builtins
+        journal = server.WorkflowJournal(self.path, flush_interval=0, max_bytes=10)
+        real_open = builtins.open
+
+        def no_append(path, mode='r', *args, **kwargs):
+            if mode == 'ab':
+                raise OSError('disk full')
+            return real_open(path, mode, *args, **kwargs)
+
+        with patch('builtins.open', no_append), patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            journal.append(self._snapshot('a', 1))
+            self.assertTrue(journal.flush(5))
+        self.assertEqual(journal.stats()['write_errors'], 1)
+        self.assertIn('disk full', stderr.getvalue())
+        journal.append(self._snapshot('a', 2, 'completed'))
+        self.assertTrue(journal.flush(5))
+        self.assertTrue(journal._writer.is_alive())
+        self.assertEqual(journal.stats()['write_errors'], 1)
+        self.assertEqual(journal.replay(), [self._snapshot('a', 2, 'completed')])
+
+    def test_ignores_torn_last_line(self):
+        with open(self.path, 'w') as f:
+            f.write(json.dumps(self._snapshot('a', 3)) + '\n{"id": "a", "vers')
+        journal = server.WorkflowJournal(self.path)
+        self.assertEqual(journal.replay(), [self._snapshot('a', 3)])
+
+    def test_compaction_keeps_live_state(self):
+        journal = server.WorkflowJournal(self.path, max_bytes=2000, keep_finished=2)
+        for n in range(50):
+            journal.append(self._snapshot(f'done{n}', 1, 'completed'))
+        journal.append(self._snapshot('live', 4))
+        journal.flush(5)
+        journal.append(self._snapshot('live', 5))
+        journal.flush(5)
+        self.assertGreater(journal.compactions, 0)
+        replayed = {snapshot['id']: snapshot['version'] for snapshot in journal.replay()}
+        self.assertEqual(replayed['live'], 5)
+        self.assertLess(len(replayed), 50)
+
+    def test_resumes_unfinished_workflow_from_last_completed_step(self):
+        steps = ['validate_date', 'calculate_age', 'determine_zodiac', 'calculate_numerology',
+                 'find_day_of_week', 'generate_fun_facts', 'complete']
+        crashed = server.WorkflowRecord('crashed', 'analyze_dob', steps, {'dob': '2000-01-01'})
+        crashed.results['validated_dob'] = '2000-01-01'
+        crashed.step_states = {'validate_date': 'completed', 'calculate_age': 'running'}
+        crashed.step_durations = {'validate_date': 123.0}
+        crashed.current_step = 1
+        crashed.version = 4
+        with open(self.path, 'w') as f:
+            f.write(json.dumps(crashed.to_dict()) + '\n')
+
+        engine = server.WorkflowEngine(step_delay=0.01, journal=server.WorkflowJournal(self.path))
+        deadline = time.monotonic() + 5
+        while engine.get_workflow_status('crashed')['status'] == 'running' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        status = engine.get_workflow_status('crashed')
+        self.assertEqual(status['status'], 'completed')
+        self.assertIn('fun_facts', status['results'])
+        # validate_date was not rerun
+        self.assertEqual(status['step_status']['validate_date']['duration_ms'], 123.0)
+        engine.journal.flush(5)
+        replayed = {snapshot['id']: snapshot for snapshot in engine.journal.replay()}
+        self.assertEqual(replayed['crashed']['status'], 'completed')
+
+    def test_engine_journals_step_transitions(self):
+        engine = server.WorkflowEngine(step_delay=0, journal=server.WorkflowJournal(self.path))
+        engine.start_workflow('wf', 'analyze_dob', {'dob': '2000-01-01'})
+        deadline = time.monotonic() + 5
+        while engine.get_workflow_status('wf')['status'] == 'running' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        engine.journal.flush(5)
+        restarted = server.WorkflowEngine(step_delay=0, journal=server.WorkflowJournal(self.path))
+        self.assertEqual(restarted.get_workflow_status('wf')['status'], 'completed')
+        # start, one entry per completed step, and the final state
+        self.assertEqual(engine.journal.entries_written, 1 + 7 + 1)
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.day = date(2025, 1, 1)
+        self.cache = server.ResultCache(max_size=2, clock=lambda: self.day)
+
+    def test_hits_and_misses(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.put('a', self.day, {'x': 1})
+        self.assertEqual(self.cache.get('a'), {'x': 1})
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_bounded_lru(self):
+        self.cache.put('a', self.day, {})
+        self.cache.put('b', self.day, {})
+        self.cache.get('a')
+        self.cache.put('c', self.day, {})
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_day_rollover_invalidates(self):
+        self.cache.put('a', self.day, {})
+        self.day = date(2025, 1, 2)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+        # Results computed yesterday are not cached today
+        self.cache.put('a', date(2025, 1, 1), {})
+        self.assertIsNone(self.cache.get('a'))
+
+    def test_engine_completes_cached_workflow_immediately(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        first = engine.run_workflow_sync('first', 'analyze_dob', {'dob': '2000-01-01'})
+        engine.scheduler.submit = MagicMock()
+        engine.start_workflow('second', 'analyze_dob', {'dob': '2000-01-01'})
+        status = engine.get_workflow_status('second')
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['results'], first['results'])
+        engine.scheduler.submit.assert_not_called()
+        self.assertEqual(engine.result_cache.hits, 1)
+
+    def test_failed_workflows_are_not_cached(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        engine.run_workflow_sync('bad', 'analyze_dob', {'dob': 'bad'})
+        self.assertEqual(len(engine.result_cache), 0)
+
+
+class TestAnalysisStats(unittest.TestCase):
+    def setUp(self):
+        self.now = 1700000000.0
+        self.stats = server.AnalysisStats(clock=lambda: self.now)
+        self.engine = server.WorkflowEngine(step_delay=0)
+
+    def results(self, dob):
+        return self.engine.run_workflow_sync('s', 'analyze_dob', {'dob': dob})['results']
+
+    def test_counts_each_dimension(self):
+        self.stats.record([self.results('1990-05-15'), self.results('1990-05-16'), {'unrelated': True}])
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot['window'], 'all')
+        self.assertEqual(snapshot['analyses'], 2)
+        self.assertEqual(snapshot['western_zodiac'], {'Taurus': 2})
+        self.assertEqual(snapshot['chinese_zodiac'], {'Horse': 2})
+        self.assertEqual(snapshot['weekday'], {'Tuesday': 1, 'Wednesday': 1})
+        self.assertEqual(sum(snapshot['life_path'].values()), 2)
+        self.assertEqual(sum(snapshot['age_bucket'].values()), 2)
+
+    def test_age_buckets(self):
+        self.assertEqual([server.AnalysisStats.age_bucket(years) for years in (0, 9, 10, 99, 100, 120)],
+                         ['0-9', '0-9', '10-19', '90-99', '100+', '100+'])
+
+    def test_windows_drop_old_analyses(self):
+        results = self.results('2000-01-01')
+        self.stats.record([results])
+        self.now += 1800
+        self.stats.record([results, results])
+        self.assertEqual(self.stats.snapshot('hour')['analyses'], 3)
+        self.now += 1800
+        hour = self.stats.snapshot('hour')
+        self.assertEqual(hour['analyses'], 2)
+        self.assertEqual(hour['western_zodiac'], {'Capricorn': 2})
+        self.assertEqual(self.stats.snapshot('day')['analyses'], 3)
+        self.now += 86400
+        self.assertEqual(self.stats.snapshot('day')['analyses'], 0)
+        self.assertEqual(self.stats.snapshot('day')['western_zodiac'], {})
+        self.assertEqual(self.stats.snapshot()['analyses'], 3)
+        with self.assertRaises(ValueError):
+            self.stats.snapshot('week')
+
+    def test_engine_counts_every_completed_analysis(self):
+        engine = server.WorkflowEngine(step_delay=0, store=server.WorkflowStore(max_size=1))
+        engine.run_workflow_sync('a', 'analyze_dob', {'dob': '1990-05-15'})
+        engine.run_workflow_sync('b', 'analyze_dob', {'dob': '1990-05-15'})  # from the result cache
+        engine.run_workflow_sync('c', 'analyze_dob', {'dob': 'bad'})
+        engine.analyze_batch(['1985-01-01', 'bad', '1970-07-04'])
+        engine.start_workflow('d', 'analyze_dob', {'dob': '1990-05-15'})
+        engine.start_workflow('e', 'analyze_dob', {'dob': '1960-02-02'})
+        deadline = time.time() + 5
+        while engine.analysis_stats.snapshot()['analyses'] < 6 and time.time() < deadline:
+            time.sleep(0.01)
+        snapshot = engine.analysis_stats.snapshot()
+        self.assertEqual(snapshot['analyses'], 6)
+        self.assertEqual(snapshot['western_zodiac']['Taurus'], 3)
+        # Evicted workflows stay counted
+        self.assertLessEqual(len(engine.workflows), 2)
+
+    def test_stats_endpoint(self):
+        handler = MockDOBFactsHandler(self.engine)
+        handler._handle_stats({'window': ['hour']})
+        self.assertEqual(handler.sent_response, 200)
+        self.assertEqual(json.loads(handler.wfile.content)['window'], 'hour')
+        handler = MockDOBFactsHandler(self.engine)
+        handler._handle_stats({'window': ['year']})
+        self.assertEqual(handler.sent_response, 400)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = server.Metrics()
+        self.metrics.counter('requests_total', 'Requests.', ('route',))
+        self.metrics.histogram('latency_seconds', 'Latency.', (0.1, 1), ('route',))
+
+    def test_renders_counters_and_cumulative_histograms(self):
+        self.metrics.inc('requests_total', ('/a',))
+        self.metrics.inc('requests_total', ('/a',))
+        for value in (0.05, 0.5, 5):
+            self.metrics.observe('latency_seconds', ('/a',), value)
+        text = self.metrics.render([('queue_depth', 'Queued.', 3)])
+        self.assertIn('# TYPE queue_depth gauge\nqueue_depth 3\n', text)
+        self.assertIn('requests_total{route="/a"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 1\n', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 3\n', text)
+        self.assertIn('latency_seconds_count{route="/a"} 3\n', text)
+        self.assertIn('latency_seconds_sum{route="/a"} 5.55\n', text)
+
+    def test_sums_tallies_across_threads_including_exited_ones(self):
+        threads = [threading.Thread(target=lambda: [self.metrics.inc('requests_total', ('/a',))
+                                                    for _ in range(1000)]) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.metrics.collect()[('requests_total', ('/a',))], [8000])
+        # Exited threads are folded in once and stop being tracked
+        self.assertEqual(self.metrics._tallies, [])
+        self.assertEqual(self.metrics.collect()[('requests_total', ('/a',))], [8000])
+
+    def test_exited_threads_are_retired_without_a_scrape(self):
+        for _ in range(50):
+            thread = threading.Thread(target=self.metrics.inc, args=('requests_total', ('/a',)))
+            thread.start()
+            thread.join()
+        self.assertLessEqual(len(self.metrics._tallies), 1)
+        self.assertEqual(self.metrics._retired[('requests_total', ('/a',))], [49])
+        self.assertEqual(self.metrics.collect()[('requests_total', ('/a',))], [50])
+
+    def test_escapes_label_values(self):
+        self.metrics.inc('requests_total', ('say "hi"\n',))
+        self.assertIn('requests_total{route="say \\"hi\\"\\n"} 1', self.metrics.render())
+
+    def test_route_labels_are_bounded(self):
+        self.assertEqual(server._route_label('/api/workflow/abc'), '/api/workflow/{id}')
+        self.assertEqual(server._route_label('/api/workflow/abc/events'), '/api/workflow/{id}/events')
+        self.assertEqual(server._route_label('/api/health'), '/api/health')
+        self.assertEqual(server._route_label('/etc/passwd'), 'other')
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = f'{self.tmp.name}/trace.json'
+        self.tracer = server.Tracer(path=self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_events(self, path=None):
+        with open(path or self.path) as f:
+            return json.loads(f.read().rstrip().rstrip(',') + ']')
+
+    def test_disabled_without_a_path(self):
+        with patch.dict('os.environ', {}, clear=True):
+            tracer = server.Tracer()
+        self.assertFalse(tracer.enabled)
+        with tracer.span('parse') as span:
+            pass
+        self.assertIs(span, server._NO_SPAN)
+        self.assertTrue(tracer.flush())
+
+    def test_writes_chrome_trace_events(self):
+        with self.tracer.span('parse', 'http', size=3):
+            pass
+        with self.assertRaises(KeyError):
+            with self.tracer.span('enqueue', 'workflow'):
+                raise KeyError('x')
+        self.assertTrue(self.tracer.flush())
+        events = self.read_events()
+        self.assertEqual(events[0]['ph'], 'M')
+        spans = [event for event in events if event['ph'] == 'X']
+        self.assertEqual([span['name'] for span in spans], ['parse', 'enqueue'])
+        self.assertEqual(spans[0]['args'], {'size': 3})
+        self.assertEqual(spans[1]['args'], {'error': 'KeyError'})
+        self.assertGreaterEqual(spans[0]['dur'], 0)
+
+    def test_rotates_past_max_bytes(self):
+        self.tracer.max_bytes = 2000
+        for i in range(50):
+            self.tracer.complete('step', 'step', i, i + 1, {'workflow_id': f'wf_{i}'})
+            self.tracer.flush()
+        self.assertGreaterEqual(self.tracer.rotations, 1)
+        rotated = self.read_events(self.path + '.1')
+        self.assertEqual(rotated[0]['ph'], 'M')
+        self.assertEqual(rotated[-1]['name'], 'step')
+        self.assertEqual(self.read_events()[-1]['args'], {'workflow_id': 'wf_49'})
+
+    def test_workflow_spans_cover_queue_wait_and_steps(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        with patch.object(server, 'TRACER', self.tracer):
+            engine.start_workflow('traced', 'analyze_dob', {'dob': '1990-05-15'})
+            deadline = time.time() + 5
+            while engine.get_workflow_status('traced')['status'] == 'running' and time.time() < deadline:
+                time.sleep(0.01)
+            engine.get_workflow_body('traced')
+        self.tracer.flush()
+        names = {event['name'] for event in self.read_events()
+                 if event['ph'] == 'X' and event['args'].get('workflow_id') == 'traced'}
+        self.assertTrue({'queue_wait', 'validate_date', 'generate_fun_facts', 'serialize'} <= names, names)
+
+
+class TestOnDemandProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = server.OnDemandProfiler(sample_interval=0.001)
+
+    def busy_loop_for_profiler(self, stop):
+        while not stop.is_set():
+            sum(range(1000))
+
+    def sum_for_profiler(self):
+        return sum(range(1000))
+
+    def test_sample_mode_reports_collapsed_stacks_from_other_threads(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=self.busy_loop_for_profiler, args=(stop,))
+        worker.start()
+        try:
+            report = self.profiler.capture(0.2)
+        finally:
+            stop.set()
+            worker.join()
+        self.assertTrue(report.startswith('# '))
+        self.assertIn('busy_loop_for_profiler', report)
+        self.assertRegex(report.splitlines()[1], r' \d+$')
+
+    def test_cprofile_mode_profiles_calls_made_during_the_capture(self):
+        self.profiler.profiled(sum, range(10))  # before the capture; not profiled
+        stop = threading.Event()
+
+        def calls():
+            while not stop.is_set():
+                self.profiler.profiled(self.sum_for_profiler)
+                time.sleep(0.01)
+
+        worker = threading.Thread(target=calls)
+        worker.start()
+        try:
+            report = self.profiler.capture(0.2, 'cprofile')
+        finally:
+            stop.set()
+            worker.join()
+        self.assertIn('cumulative', report)
+        self.assertIn('sum_for_profiler', report)
+        self.assertIn('No requests', self.profiler.capture(0, 'cprofile'))
+
+    def test_profiling_failures_never_fail_the_profiled_call(self):
+        self.profiler._cprofile_until = time.monotonic() + 60
+        try:
+            with patch.object(server.cProfile.Profile, 'enable', side_effect=ValueError('another profiler')):
+                self.assertEqual(self.profiler.profiled(self.sum_for_profiler), 499500)
+            with patch.object(server.pstats, 'Stats', side_effect=TypeError('no stats')):
+                self.assertEqual(self.profiler.profiled(self.sum_for_profiler), 499500)
+            with self.assertRaises(ZeroDivisionError):
+                self.profiler.profiled(lambda: 1 / 0)
+        finally:
+            self.profiler._cprofile_until = 0.0
+
+    def test_rejects_unknown_modes_and_concurrent_captures(self):
+        with self.assertRaises(ValueError):
+            self.profiler.capture(0, 'perf')
+        self.profiler._capture_lock.acquire()
+        try:
+            with self.assertRaises(RuntimeError):
+                self.profiler.capture(0)
+        finally:
+            self.profiler._capture_lock.release()
+
+    def test_profile_endpoint_requires_the_admin_token(self):
+        engine = server.WorkflowEngine(step_delay=0)
+        handler = MockDOBFactsHandler(engine)
+        handler.send_error = MagicMock()
+        with patch.dict('os.environ', {}, clear=True):
+            handler._handle_profile({})
+        handler.send_error.assert_called_once_with(404)
+        with patch.dict('os.environ', {'ADMIN_TOKEN': 'secret'}):
+            handler = MockDOBFactsHandler(engine)
+            handler.headers = {'Authorization': 'Bearer wrong'}
+            handler._handle_profile({})
+            self.assertEqual(handler.sent_response, 403)
+            handler = MockDOBFactsHandler(engine)
+            handler.headers = {'Authorization': 'Bearer secret'}
+            handler._handle_profile({'seconds': ['0.05'], 'mode': ['sample']})
+            self.assertEqual(handler.sent_response, 200)
+            self.assertEqual(handler.sent_headers['Content-Type'], 'text/plain; charset=utf-8')
+            self.assertTrue(handler.wfile.content.startswith(b'# '))
+            handler = MockDOBFactsHandler(engine)
+            handler.headers = {'Authorization': 'Bearer secret'}
+            handler._handle_profile({'mode': ['perf']})
+            self.assertEqual(handler.sent_response, 400)
+            for seconds in ('nan', 'inf'):
+                handler = MockDOBFactsHandler(engine)
+                handler.headers = {'Authorization': 'Bearer secret'}
+                handler._handle_profile({'seconds': [seconds], 'mode': ['cprofile']})
+                self.assertEqual(handler.sent_response, 400)
+        self.assertEqual(server.PROFILER._cprofile_until, 0.0)
+
+    def test_cprofile_window_closes_even_if_the_capture_fails(self):
+        with patch('time.sleep', side_effect=ValueError('bad sleep')):
+            with self.assertRaises(ValueError):
+                self.profiler.capture(1, 'cprofile')
+        self.assertEqual(self.profiler._cprofile_until, 0.0)
+        self.assertIsNone(self.profiler.profiled(lambda: None))
+        self.assertIsNone(self.profiler._stats)
+
+
+class TestProcessTaskQueue(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = server.WorkflowEngine(step_delay=0.01, processes=2, result_cache=server.ResultCache(0))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.engine.task_queue.close()
+
+    def wait_for_status(self, workflow_id, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            status = self.engine.get_workflow_status(workflow_id)
+            if status['status'] in ('completed', 'failed'):
+                return status
+            time.sleep(0.02)
+        self.fail(f"{workflow_id} did not finish")
+
+    def test_workflow_runs_in_worker_process(self):
+        self.engine.start_workflow('proc_1', 'analyze_dob', {'dob': '1990-05-15'})
+        status = self.wait_for_status('proc_1')
+        expected = server.WorkflowEngine(step_delay=0).run_workflow_sync('local', 'analyze_dob', {'dob': '1990-05-15'})
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['results'], expected['results'])
+        # Progress snapshots from the worker are republished locally
+        self.assertGreater(status['version'], len(self.engine.workflow_steps['analyze_dob']))
+        self.assertGreaterEqual(self.engine.task_queue.stats()['tasks_completed'], 1)
+
+    def test_workflow_failure_in_worker_process(self):
+        self.engine.start_workflow('proc_bad', 'analyze_dob', {'dob': 'not-a-date'})
+        status = self.wait_for_status('proc_bad')
+        self.assertEqual(status['status'], 'failed')
+        self.assertIn('Invalid date format', status['error'])
+
+    def test_large_batch_is_split_across_processes(self):
+        dobs = ['1990-05-15', '2000-02-29', 'bad'] * (server.BATCH_PROCESS_CHUNK)
+        today = date(2025, 6, 1)
+        submitted = self.engine.task_queue.tasks_submitted
+        distributed = self.engine.analyze_batch(dobs, today)
+        local = server.WorkflowEngine(step_delay=0).analyze_batch(dobs, today)
+        self.assertGreaterEqual(self.engine.task_queue.tasks_submitted - submitted, 2)
+        self.assertEqual(distributed['items'], local['items'])
+        self.assertEqual(distributed['errors'], local['errors'])
+        self.assertEqual(distributed['summary']['failed'], local['summary']['failed'])
+
+    def test_dead_worker_fails_its_task_and_is_replaced(self):
+        task_queue = server.ProcessTaskQueue(1)
+        try:
+            payload = {'workflow': server.WorkflowRecord('slow', 'analyze_dob', [], {'dob': '1990-05-15'}).to_dict(),
+                       'step_delay': 5}
+            killed = []
+
+            def kill_worker(snapshot):
+                if not killed:
+                    killed.append(True)
+                    next(iter(task_queue._workers.values())).kill()
+
+            with self.assertRaisesRegex(RuntimeError, 'exited'):
+                task_queue.run('workflow', payload, on_progress=kill_worker)
+            self.assertEqual(task_queue.stats()['workers_restarted'], 1)
+            result = task_queue.run('batch', {'dobs': ['1990-05-15'], 'today': '2025-06-01'})
+            self.assertEqual(result['summary']['succeeded'], 1)
+        finally:
+            task_queue.close()
+
+    def test_worker_that_died_idle_is_replaced_on_dispatch(self):
+        task_queue = server.ProcessTaskQueue(1)
+        payload = {'dobs': ['1990-05-15'], 'today': '2025-06-01'}
+        try:
+            task_queue.run('batch', payload)
+            # Leave the death for the dispatch to find
+            with patch.object(task_queue, '_replace_worker'):
+                worker = next(iter(task_queue._workers.values()))
+                worker.kill()
+                worker.join()
+                result = task_queue.run('batch', payload)
+            self.assertEqual(result['summary']['succeeded'], 1)
+            self.assertEqual(task_queue.stats()['workers_restarted'], 1)
+            self.assertEqual(task_queue.run('batch', payload)['summary']['succeeded'], 1)
+        finally:
+            task_queue.close()
+
+
+class TestDOBFactsHTTPServer(unittest.TestCase):
+    def setUp(self):
+        import threading
+        self.engine = server.WorkflowEngine()
+        handler_cls = type('QuietHandler', (server.DOBFactsHandler,), {'log_message': lambda *args: None})
+        handler = lambda *args, **kwargs: handler_cls(*args, workflow_engine=self.engine, **kwargs)
+        self.httpd = server.DOBFactsHTTPServer(('127.0.0.1', 0), handler, max_connections=2)
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_keep_alive_reuses_connection(self):
+        import http.client
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        body = json.dumps({'dob': '2000-01-01'})
+        conn.request('POST', '/api/analyze', body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        self.assertEqual(response.version, 11)
+        workflow_id = json.loads(response.read())['workflow_id']
+        sock = conn.sock
+
+        conn.request('GET', f'/api/workflow/{workflow_id}')
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(json.loads(response.read())['id'], workflow_id)
+        self.assertIs(conn.sock, sock)
+
+        conn.request('GET', '/api/health')
+        self.assertEqual(json.loads(conn.getresponse().read())['status'], 'healthy')
+        conn.request('GET', '/api/health/live')
+        self.assertEqual(json.loads(conn.getresponse().read())['status'], 'alive')
+        conn.request('GET', '/api/health/ready')
+        self.assertEqual(json.loads(conn.getresponse().read())['status'], 'ready')
+        conn.close()
+
+    def test_malformed_request_lines_are_rejected_and_counted(self):
+        import socket
+        self.httpd.handle_error = MagicMock()
+        for request_line, status in ((b'GARBAGE', b'400'), (b'GET / HTTP/2.0', b'505')):
+            with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+                # A valid request first, so a stale path would be at hand
+                sock.sendall(b'GET /api/health/live HTTP/1.1\r\nHost: x\r\n\r\n' + request_line + b'\r\n\r\n')
+                response = b''
+                while True:
+                    data = sock.recv(65536)
+                    if not data:
+                        break
+                    response += data
+            self.assertIn(b'Error code: ' + status, response)
+        self.httpd.handle_error.assert_not_called()
+        text = server.METRICS.render()
+        self.assertIn('dob_http_requests_total{method="INVALID",route="other",status="400"}', text)
+        self.assertIn('dob_http_requests_total{method="INVALID",route="other",status="505"}', text)
+
+    def test_metrics_endpoint(self):
+        import http.client
+        self.engine.step_delay = 0
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        conn.request('POST', '/api/analyze?mode=sync', body=json.dumps({'dob': '1990-05-15'}))
+        conn.getresponse().read()
+        conn.request('GET', '/api/metrics')
+        response = conn.getresponse()
+        text = response.read().decode('utf-8')
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.getheader('Content-Type').startswith('text/plain; version=0.0.4'))
+        self.assertIn('dob_http_requests_total{method="POST",route="/api/analyze",status="200"}', text)
+        self.assertIn('dob_http_request_duration_seconds_count{method="POST",route="/api/analyze"}', text)
+        self.assertIn('dob_workflow_step_duration_seconds_bucket{workflow_type="analyze_dob",step="validate_date"', text)
+        self.assertIn('dob_workflows_finished_total{workflow_type="analyze_dob",status="completed"}', text)
+        for gauge in ('dob_workflow_queue_depth', 'dob_workflows_in_progress', 'dob_workflow_store_entries',
+                      'dob_threads'):
+            self.assertIn(f'\n{gauge} ', text)
+        conn.close()
+
+    def test_conditional_polling(self):
+        import http.client
+        self.engine.step_delay = 0
+        self.engine.start_workflow('cond', 'analyze_dob', {'dob': '2000-01-01'})
+        deadline = time.time() + 5
+        while self.engine.get_workflow_status('cond')['status'] == 'running' and time.time() < deadline:
+            time.sleep(0.01)
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        conn.request('GET', '/api/workflow/cond')
+        response = conn.getresponse()
+        body = response.read()
+        etag = response.getheader('ETag')
+        conn.request('GET', '/api/workflow/cond', headers={'If-None-Match': etag})
+        response = conn.getresponse()
+        self.assertEqual(response.status, 304)
+        self.assertEqual(response.read(), b'')
+        # The connection stays usable after a bodyless 304
+        conn.request('GET', '/api/workflow/cond')
+        self.assertEqual(conn.getresponse().read(), body)
+        conn.close()
+
+    def test_long_poll_waits_for_change(self):
+        import http.client
+        self.engine.step_delay = 0.2
+        self.engine.start_workflow('lp', 'analyze_dob', {'dob': '2000-01-01'})
+        version = self.engine.get_workflow_status('lp')['version']
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        started = time.monotonic()
+        conn.request('GET', f'/api/workflow/lp?wait=5&since={version}')
+        workflow = json.loads(conn.getresponse().read())
+        self.assertGreater(workflow['version'], version)
+        self.assertLess(time.monotonic() - started, 1)
+        conn.close()
+
+    def test_long_poll_rejects_non_finite_wait(self):
+        import http.client
+        self.engine.run_workflow_sync('lp_nan', 'analyze_dob', {'dob': '2000-01-01'})
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        for wait in ('nan', 'inf'):
+            conn.request('GET', f'/api/workflow/lp_nan?wait={wait}')
+            response = conn.getresponse()
+            self.assertEqual(response.status, 400)
+            self.assertIn('finite', json.loads(response.read())['error'])
+        conn.close()
+
+    def test_long_poll_unknown_workflow(self):
+        import http.client
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        conn.request('GET', '/api/workflow/missing?wait=1')
+        self.assertEqual(conn.getresponse().status, 404)
+        conn.close()
+
+    def test_sse_streams_until_completed(self):
+        import http.client
+        self.engine.step_delay = 0.02
+        self.engine.start_workflow('sse', 'analyze_dob', {'dob': '2000-01-01'})
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        conn.request('GET', '/api/workflow/sse/events')
+        response = conn.getresponse()
+        self.assertEqual(response.getheader('Content-Type'), 'text/event-stream')
+        events = [json.loads(line[len('data: '):]) for line in response.read().decode().splitlines()
+                  if line.startswith('data: ')]
+        versions = [event['version'] for event in events]
+        self.assertEqual(versions, sorted(set(versions)))
+        self.assertEqual(events[-1]['status'], 'completed')
+        self.assertIn('fun_facts', events[-1]['results'])
+        conn.close()
+
+    def test_serves_connections_concurrently(self):
+        import http.client
+        import socket
+        # An idle client holding a connection must not stall other clients
+        idle = socket.create_connection(('127.0.0.1', self.port))
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+            conn.request('GET', '/api/health')
+            self.assertEqual(conn.getresponse().status, 200)
+            conn.close()
+        finally:
+            idle.close()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,7 +3,7 @@ import { Calendar, Clock, Star, Heart, Sparkles, Loader2 } from 'lucide-react';
 import DateInput from './components/DateInput';
 import ResultsDisplay from './components/ResultsDisplay';
 import WorkflowTracker from './components/WorkflowTracker';
-import { analyzeDOB, pollWorkflowStatus } from './services/api';
+import { analyzeDOB, pollWorkflowStatus, watchWorkflowStatus } from './services/api';
 import type { WorkflowStatus, AnalysisResults } from './types';
 
 function App() {
@@ -22,27 +22,54 @@ function App() {
       const response = await analyzeDOB(dob);
       const workflowId = response.workflow_id;
       
-      // Poll for workflow completion
-      const pollInterval = setInterval(async () => {
-        try {
-          const status = await pollWorkflowStatus(workflowId);
-          setWorkflowStatus(status);
-          
-          if (status.status === 'completed') {
-            setResults(status.results);
-            setIsAnalyzing(false);
-            clearInterval(pollInterval);
-          } else if (status.status === 'failed') {
-            console.error('Workflow failed:', status.error);
+      const handleStatus = (status: WorkflowStatus) => {
+        setWorkflowStatus(status);
+        
+        if (status.status === 'completed') {
+          setResults(status.results ?? null);
+          setIsAnalyzing(false);
+          return true;
+        } else if (status.status === 'failed') {
+          console.error('Workflow failed:', status.error);
+          setIsAnalyzing(false);
+          return true;
+        }
+        return false;
+      };
+      
+      // Poll for workflow completion; used when the event stream is unavailable
+      const startPolling = () => {
+        const pollInterval = setInterval(async () => {
+          try {
+            const status = await pollWorkflowStatus(workflowId);
+            if (handleStatus(status)) {
+              clearInterval(pollInterval);
+            }
+          } catch (error) {
+            console.error('Error polling workflow:', error);
             setIsAnalyzing(false);
             clearInterval(pollInterval);
           }
-        } catch (error) {
-          console.error('Error polling workflow:', error);
-          setIsAnalyzing(false);
-          clearInterval(pollInterval);
-        }
-      }, 1000);
+        }, 1000);
+      };
+      
+      if (typeof EventSource === 'undefined') {
+        startPolling();
+      } else {
+        let finished = false;
+        watchWorkflowStatus(
+          workflowId,
+          (status) => {
+            finished = handleStatus(status);
+          },
+          (error) => {
+            if (!finished) {
+              console.warn('Falling back to polling:', error);
+              startPolling();
+            }
+          },
+        );
+      }
       
     } catch (error) {
       console.error('Error starting analysis:', error);
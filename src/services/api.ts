@@ -30,3 +30,27 @@ export const pollWorkflowStatus = async (workflowId: string) => {
 
   return response.json();
 };
+
+// Subscribes to workflow status changes over Server-Sent Events.
+// Returns a function that closes the stream.
+export const watchWorkflowStatus = (
+  workflowId: string,
+  onStatus: (status: any) => void,
+  onError: (error: Error) => void,
+) => {
+  const source = new EventSource(`${API_BASE_URL}/api/workflow/${workflowId}/events`);
+
+  source.addEventListener('status', (event) => {
+    const status = JSON.parse((event as MessageEvent).data);
+    onStatus(status);
+    if (status.status !== 'running') {
+      source.close();
+    }
+  });
+  source.onerror = () => {
+    source.close();
+    onError(new Error('Workflow status stream failed'));
+  };
+
+  return () => source.close();
+};
@@ -9,6 +9,13 @@ export interface WorkflowStatus {
   started_at: string;
   completed_at?: string;
   error?: string;
+  queue_wait_ms?: number | null;
+  step_status?: Record<string, StepStatus>;
+}
+
+export interface StepStatus {
+  status: 'pending' | 'running' | 'completed' | 'failed';
+  duration_ms: number | null;
 }
 
 export interface AnalysisResults {